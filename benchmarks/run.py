@@ -0,0 +1,349 @@
+"""
+Reproducible throughput/latency benchmarks for ingest and search.
+
+Runs fully offline: a deterministic hash embedder stands in for the
+SentenceTransformer model, synthetic corpora are generated from a fixed
+seed, and every store (uploads, job DB, Qdrant) lives in a temporary
+working directory. Results are written as JSON so runs of different
+versions can be diffed.
+
+    python -m benchmarks.run --sizes 100,1000 --output bench_results.json
+    python -m benchmarks.run --only chunking,vector_db --embedder real
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.stubs import (  # noqa: E402
+    HashEmbeddingService, make_corpus, make_pdf, make_docx, make_xlsx, make_pptx, make_zip, make_ndjson
+)
+
+SUITES = ("loaders", "chunking", "embedding", "vector_db", "e2e")
+SEARCH_QUERIES = 200
+CONCURRENCY = 16
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ms = sorted(s * 1000 for s in samples)
+    if len(ms) > 1:
+        q = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = q[49], q[94], q[98]
+    else:
+        p50 = p95 = p99 = ms[0]
+    return {
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.results: List[Dict[str, Any]] = []
+
+    def add(self, name: str, size: int, wall_seconds: float, items: int, unit: str,
+            samples: Optional[List[float]] = None, **extra):
+        result = {
+            "name": name,
+            "size": size,
+            "items": items,
+            "unit": unit,
+            "wall_seconds": round(wall_seconds, 4),
+            "throughput_per_s": round(items / wall_seconds, 2) if wall_seconds > 0 else None,
+            **latency_stats(samples or []),
+            **extra,
+        }
+        self.results.append(result)
+        print(f"  {name:<28} size={size:<6} {result['throughput_per_s']} {unit}/s"
+              + (f"  p50={result['p50_ms']}ms p99={result['p99_ms']}ms" if samples else ""))
+
+    def skip(self, name: str, size: int, reason: str):
+        self.results.append({"name": name, "size": size, "skipped": reason})
+        print(f"  {name:<28} size={size:<6} skipped ({reason})")
+
+
+def time_each(items, fn: Callable) -> (float, List[float], List[Any]):
+    samples, outputs = [], []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        outputs.append(fn(item))
+        samples.append(time.perf_counter() - t0)
+    return time.perf_counter() - started, samples, outputs
+
+
+def bench_loaders(rec: Recorder, size: int, corpus: List[str], max_files: int):
+    from src.processing.loaders.text_loader import load_text
+    from src.processing.loaders.archive_loader import load_archive
+
+    count = min(size, max_files)
+    docs = corpus[:count]
+    folder = os.path.abspath(os.path.join("bench_files", str(size)))
+    os.makedirs(folder, exist_ok=True)
+
+    def run(name: str, ext: str, make: Callable, load: Callable, pages_per_doc: int = 4):
+        paths = []
+        try:
+            for i, text in enumerate(docs):
+                path = os.path.join(folder, f"doc_{i}.{ext}")
+                parts = text.split("\n")
+                make(path, ["\n".join(parts[j::pages_per_doc]) for j in range(pages_per_doc)])
+                paths.append(path)
+        except ImportError as e:
+            rec.skip(f"loader.{name}", size, f"missing dependency: {e.name}")
+            return
+        total_bytes = sum(os.path.getsize(p) for p in paths)
+        wall, samples, _ = time_each(paths, load)
+        rec.add(f"loader.{name}", size, wall, len(paths), "docs", samples,
+                mb_per_s=round(total_bytes / wall / 1e6, 3) if wall else None)
+
+    def write_text(path, parts):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(parts))
+
+    run("text", "txt", write_text, load_text)
+
+    try:
+        from src.processing.loaders.pdf_loader import load_pdf
+        run("pdf", "pdf", make_pdf, load_pdf)
+    except ImportError as e:
+        rec.skip("loader.pdf", size, f"missing dependency: {e.name}")
+
+    from src.processing.loaders.office_loader import load_docx, load_xlsx, load_pptx
+    run("docx", "docx", make_docx, load_docx)
+    run("xlsx", "xlsx", make_xlsx, load_xlsx, pages_per_doc=20)
+    run("pptx", "pptx", make_pptx, load_pptx)
+
+    archive = os.path.join(folder, "corpus.zip")
+    make_zip(archive, docs)
+    # load_archive caps the number of member files at 50
+    wall, samples, outputs = time_each(range(3), lambda _: load_archive(archive, max_files=50))
+    if outputs[0].get("status") == "error":
+        rec.skip("loader.zip", size, outputs[0].get("error", "error"))
+        return
+    rec.add("loader.zip", size, wall, 3, "archives", samples,
+            members=min(count, 50), archive_bytes=os.path.getsize(archive))
+
+
+def bench_chunking(rec: Recorder, size: int, corpus: List[str]) -> List[List[str]]:
+    from src.processing.chunking import recursive_character_chunking
+    wall, samples, chunked = time_each(corpus, recursive_character_chunking)
+    chunk_count = sum(len(c) for c in chunked)
+    rec.add("chunking", size, wall, len(corpus), "docs", samples,
+            chunks=chunk_count, chunks_per_s=round(chunk_count / wall, 2) if wall else None)
+    return chunked
+
+
+def bench_embedding(rec: Recorder, size: int, chunks: List[str], embedder) -> List[List[float]]:
+    from src.processing.batching import EMBED_BATCH_SIZE
+    batches = [chunks[i:i + EMBED_BATCH_SIZE] for i in range(0, len(chunks), EMBED_BATCH_SIZE)]
+    wall, samples, outputs = time_each(batches, embedder.embed_batch)
+    rec.add("embedding.embed_batch", size, wall, len(chunks), "chunks", samples,
+            batch_size=EMBED_BATCH_SIZE)
+    wall, samples, _ = time_each(chunks[:SEARCH_QUERIES], embedder.embed_text)
+    rec.add("embedding.embed_text", size, wall, min(len(chunks), SEARCH_QUERIES), "texts", samples)
+    return [v for batch in outputs for v in batch]
+
+
+def bench_vector_db(rec: Recorder, size: int, chunked: List[List[str]], vectors: List[List[float]], embedder):
+    from src.storage.vector_db import VectorDBStub
+    db = VectorDBStub(db_path=os.path.abspath(f"bench_qdrant_{size}"))
+    try:
+        docs = []
+        offset = 0
+        for i, chunks in enumerate(chunked):
+            docs.append((i, chunks, vectors[offset:offset + len(chunks)]))
+            offset += len(chunks)
+
+        def upsert(doc):
+            i, chunks, doc_vectors = doc
+            db.upsert_chunks(chunks, doc_vectors, keys=[f"group:{i % 10}", "bench"],
+                             metadata={"source": "bench"}, filename=f"doc_{i}.txt")
+
+        wall, samples, _ = time_each(docs, upsert)
+        rec.add("vector_db.upsert_chunks", size, wall, len(vectors), "points", samples, docs=len(docs))
+
+        queries = [embedder.embed_text(c[0]) for c in chunked[:SEARCH_QUERIES] if c]
+        for name, kwargs in (
+            ("vector_db.search", {}),
+            ("vector_db.search_filtered", {"filter_keys": ["group:3"]}),
+            ("vector_db.search_excluded", {"exclude_keys": ["group:3"]}),
+        ):
+            wall, samples, _ = time_each(queries, lambda q: db.search(q, top_k=10, **kwargs))
+            rec.add(name, size, wall, len(queries), "queries", samples, points=len(vectors), top_k=10)
+    finally:
+        db.close()
+
+
+async def _run_concurrent(calls: List[Callable], concurrency: int) -> (float, List[float]):
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+
+    async def one(call):
+        async with semaphore:
+            t0 = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(c) for c in calls))
+    return time.perf_counter() - started, samples
+
+
+async def bench_e2e(rec: Recorder, size: int, corpus: List[str], embedder):
+    import httpx
+    import src.storage.embeddings as embeddings
+    import src.storage.vector_db as vector_db
+    from src.main import app
+
+    embeddings._embedding_service = embedder
+    vector_db.close_vector_db()
+    vector_db._vector_db = vector_db.VectorDBStub(db_path=os.path.abspath(f"bench_e2e_qdrant_{size}"))
+
+    async def check(response):
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.request.url} -> {response.status_code}: {response.text[:200]}")
+        return response
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # The ASGI transport returns after background tasks ran, so this covers full processing
+            async def ingest(i: int, text: str):
+                await check(await client.post(
+                    "/ingest",
+                    files={"file": (f"e2e_{size}_{i}.txt", text.encode("utf-8"), "text/plain")},
+                    data={"keys": json.dumps([f"group:{i % 10}", "e2e"])}
+                ))
+
+            calls = [(lambda i=i, text=text: ingest(i, text)) for i, text in enumerate(corpus)]
+            wall, samples = await _run_concurrent(calls, CONCURRENCY)
+            rec.add("e2e.ingest", size, wall, len(corpus), "docs", samples, concurrency=CONCURRENCY)
+
+            body = make_ndjson(corpus, ["bulk"])
+            t0 = time.perf_counter()
+            response = await check(await client.post("/ingest/bulk", content=body,
+                                                     headers={"Content-Type": "application/x-ndjson"}))
+            wall = time.perf_counter() - t0
+            rec.add("e2e.ingest_bulk", size, wall, len(corpus), "docs",
+                    chunks=response.json().get("chunk_count"), body_bytes=len(body))
+
+            queries = [" ".join(text.split()[:8]) for text in corpus[:SEARCH_QUERIES]]
+            for name, extra in (("e2e.search", {}), ("e2e.search_filtered", {"filter_keys": ["group:3"]})):
+                async def search(q: str, extra=extra):
+                    await check(await client.post("/search", json={"query": q, "top_k": 10, **extra}))
+
+                calls = [(lambda q=q: search(q)) for q in queries]
+                wall, samples = await _run_concurrent(calls, CONCURRENCY)
+                rec.add(name, size, wall, len(queries), "queries", samples, concurrency=CONCURRENCY)
+    finally:
+        vector_db.close_vector_db()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rog ingest/search benchmarks")
+    parser.add_argument("--sizes", default="100,1000", help="Comma separated corpus sizes (documents)")
+    parser.add_argument("--words", type=int, default=400, help="Words per synthetic document")
+    parser.add_argument("--only", default=",".join(SUITES), help=f"Suites to run: {','.join(SUITES)}")
+    parser.add_argument("--embedder", choices=("hash", "real"), default="hash",
+                        help="'hash' is the offline stand-in, 'real' loads the configured model")
+    parser.add_argument("--max-loader-files", type=int, default=100, help="Files per loader benchmark")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    suites = [s for s in args.only.split(",") if s]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"Unknown suites: {', '.join(sorted(unknown))}")
+    output = os.path.abspath(args.output)
+
+    # Relative data paths (uploads, job DB, Qdrant) resolve inside the scratch dir
+    workdir = tempfile.mkdtemp(prefix="rog-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("ROG_WARMUP", "0")
+
+    if args.embedder == "real":
+        from src.storage.embeddings import EmbeddingService
+        embedder = EmbeddingService()
+    else:
+        embedder = HashEmbeddingService()
+
+    rec = Recorder()
+    print(f"Benchmarking sizes={sizes} suites={suites} embedder={args.embedder} (workdir {workdir})")
+    try:
+        for size in sizes:
+            corpus = make_corpus(size, args.words)
+            if "loaders" in suites:
+                bench_loaders(rec, size, corpus, args.max_loader_files)
+            chunked = None
+            if {"chunking", "embedding", "vector_db"} & set(suites):
+                chunked = bench_chunking(rec, size, corpus) if "chunking" in suites else None
+                if chunked is None:
+                    from src.processing.chunking import recursive_character_chunking
+                    chunked = [recursive_character_chunking(t) for t in corpus]
+            if "embedding" in suites or "vector_db" in suites:
+                flat = [c for chunks in chunked for c in chunks]
+                if "embedding" in suites:
+                    vectors = bench_embedding(rec, size, flat, embedder)
+                else:
+                    vectors = embedder.embed_batch(flat)
+                if "vector_db" in suites:
+                    bench_vector_db(rec, size, chunked, vectors, embedder)
+            if "e2e" in suites:
+                asyncio.run(bench_e2e(rec, size, corpus, embedder))
+    finally:
+        os.chdir(REPO_ROOT)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    from src.main import app
+    report = {
+        "meta": {
+            "app_version": app.version,
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "embedder": args.embedder,
+            "sizes": sizes,
+            "words_per_doc": args.words,
+        },
+        "results": rec.results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(rec.results)} results to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Offline stand-ins and synthetic data for the benchmark suite.
+"""
+import hashlib
+import io
+import random
+import re
+import zipfile
+from typing import List
+import numpy as np
+
+VECTOR_SIZE = 384
+_TOKEN = re.compile(r"\w+")
+
+WORDS = (
+    "rose tulip engine invoice report profit margin quarter module sorter "
+    "assembly manual torque bolt conveyor sensor voltage customer contract "
+    "delivery warranty pipeline storage vector search index cluster replica "
+    "latency throughput budget forecast revenue audit compliance policy"
+).split()
+
+
+class HashEmbeddingService:
+    """
+    Deterministic embedder with the EmbeddingService interface.
+    Each token is hashed into a signed bucket (feature hashing), so texts
+    sharing words get similar vectors and results are stable across runs.
+    """
+    def __init__(self, dim: int = VECTOR_SIZE):
+        self.dim = dim
+        self.model_name = "hash"
+
+    def embed_array(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                out[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(out[row])
+            if norm:
+                out[row] /= norm
+            else:
+                out[row, 0] = 1.0
+        return out
+
+    def embed_text(self, text: str):
+        return self.embed_array([text])[0].tolist()
+
+    def embed_batch(self, texts: list):
+        return self.embed_array(texts).tolist()
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 18))
+        sentences.append(" ".join(rng.choice(WORDS) for _ in range(length)).capitalize() + ".")
+        remaining -= length
+    # A paragraph break every few sentences gives the chunker natural split points
+    return "\n".join(" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5))
+
+
+def make_corpus(size: int, words_per_doc: int = 400, seed: int = 42) -> List[str]:
+    rng = random.Random(seed + size)
+    return [make_text(rng, words_per_doc) for _ in range(size)]
+
+
+def make_pdf(path: str, pages: List[str]):
+    import fitz
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def make_docx(path: str, paragraphs: List[str]):
+    from docx import Document
+    doc = Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+def make_xlsx(path: str, rows: List[str]):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for i, text in enumerate(rows):
+        ws.append([i, text[:200], len(text)])
+    wb.save(path)
+
+
+def make_pptx(path: str, slides: List[str]):
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    for text in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(5))
+        box.text_frame.text = text
+    prs.save(path)
+
+
+def make_zip(path: str, texts: List[str]):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, text in enumerate(texts):
+            zf.writestr(f"doc_{i}.txt", text)
+
+
+def make_ndjson(texts: List[str], keys: List[str]) -> bytes:
+    import json
+    buffer = io.BytesIO()
+    for i, text in enumerate(texts):
+        buffer.write(json.dumps({"text": text, "keys": keys, "filename": f"bulk_{i}.txt"}).encode("utf-8"))
+        buffer.write(b"\n")
+    return buffer.getvalue()
@@ -0,0 +1,26 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import Header, HTTPException
+
+# Admin endpoints (profiling, maintenance) are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("ROG_ADMIN_TOKEN")
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency for admin-only endpoints.
+    Responds 404 when admin endpoints are disabled, 403 on a wrong token.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def require_writable():
+    """
+    FastAPI dependency for endpoints that modify the store.
+    Read-only replicas (ROG_ROLE=reader) answer 403.
+    """
+    from .storage.vector_db import ROLE
+    if ROLE == "reader":
+        raise HTTPException(status_code=403, detail="Read-only replica; send writes to the writer")
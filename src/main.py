@@ -1,15 +1,62 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks
+import time
+_import_started = time.perf_counter()
+from .startup import get_warmup_state, run_warmup, WARMUP_ENABLED
+
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, BackgroundTasks, Header, Query, Request, Depends
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse, JSONResponse, PlainTextResponse, Response
+from contextlib import asynccontextmanager
 from typing import List, Optional
+import asyncio
 import json
+import logging
 import os
-from .models import SearchQuery, SearchResponse, SearchResultChunk
+from .models import SearchQuery, SearchResponse, DeleteRequest, DeleteResponse
+from .search import run_search, stream_search, decode_cursor, InvalidCursor, MAX_STREAM_RESULTS
+from .metrics import render_metrics, HTTP_REQUEST_SECONDS, REGISTRY
+from .admin import require_admin, require_writable
+from . import profiling
+from .processing.jobs import get_job_manager, JobStatus
+from .processing.events import stream_job_events
+from .processing.ingest import save_upload_file, process_job, process_batch_job, process_ndjson_stream, iter_lines, UPLOAD_DIR
+from .processing.retention import delete_documents, apply_retention, compact_storage, retention_loop, RETENTION_DAYS
+from .storage.snapshot import export_snapshot, import_snapshot, SNAPSHOT_DIR, MANIFEST_FILE
+from .storage.replica import publish_generation, publish_loop
+from .storage.vector_db import (
+    ROLE, close_vector_db, file_filter, keys_filter, ingested_before_filter, combine_filters
+)
+
+logger = logging.getLogger("rog.main")
+
+get_warmup_state().import_seconds = round(time.perf_counter() - _import_started, 3)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state = get_warmup_state()
+    logger.info(f"Imports took {state.import_seconds}s")
+    warmup_task = None
+    if WARMUP_ENABLED:
+        # Warm up in the background so the liveness probe answers right away
+        warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup, state))
+    else:
+        state.mark_ready()
+    background = []
+    if RETENTION_DAYS > 0 and ROLE != "reader":
+        background.append(asyncio.create_task(retention_loop()))
+    if ROLE == "writer":
+        background.append(asyncio.create_task(publish_loop()))
+    yield
+    for task in background:
+        task.cancel()
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
+    close_vector_db()
 
 app = FastAPI(
     title="Rog Knowledge Service",
     description="A headless AI knowledge service for ingesting and retrieving documents based on keys.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -22,6 +69,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
+def _jobs_by_status():
+    job_manager = get_job_manager()
+    return {(status.value,): job_manager.count_jobs(status) for status in JobStatus}
+
+REGISTRY.gauge("rog_jobs", "Jobs in the job store by status (PENDING is the ingest queue depth)", ["status"]) \
+    .set_function(_jobs_by_status)
+
 # Mount static files
 static_dir = os.path.join(os.path.dirname(__file__), "..", "static")
 if not os.path.exists(static_dir):
@@ -33,7 +105,24 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 async def root():
     return RedirectResponse(url="/static/index.html")
 
-@app.post("/ingest", summary="Ingest a document (Async)")
+@app.get("/healthz", summary="Liveness probe")
+async def healthz():
+    return {"status": "ok"}
+
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/readyz", summary="Readiness probe")
+async def readyz():
+    """
+    200 once the embedding model and vector store are loaded, 503 before
+    (or if warm-up failed). Also reports import and startup timings.
+    """
+    state = get_warmup_state()
+    return JSONResponse(status_code=200 if state.ready else 503, content=state.as_dict())
+
+@app.post("/ingest", summary="Ingest a document (Async)", dependencies=[Depends(require_writable)])
 async def ingest_document(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
@@ -54,18 +143,13 @@ async def ingest_document(
             metadata_dict = json.loads(metadata)
             
         # Create Job
-        from .processing.jobs import get_job_manager
         job_manager = get_job_manager()
         job_id = job_manager.create_job()
         
-        # Dispatch to background
-
         # 1. Save file synchronously (or await in handler)
-        from .processing.ingest import save_upload_file
         file_path = await save_upload_file(file)
         
         # 2. Dispatch background task with file path
-        from .processing.ingest import process_job
         
         background_tasks.add_task(process_job, file_path, keys_list, metadata_dict, job_id)
         
@@ -81,51 +165,192 @@ async def ingest_document(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ingest/batch", summary="Ingest several documents as one job (Async)", dependencies=[Depends(require_writable)])
+async def ingest_documents(
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    keys: str = Form(..., description="JSON string list of keys, applied to every file"),
+    metadata: Optional[str] = Form(None, description="JSON string metadata, applied to every file")
+):
+    """
+    Ingest many files in one request. Returns a parent Job ID and one child
+    Job ID per file; chunks of all files are embedded and stored in large batches.
+    """
+    try:
+        keys_list = json.loads(keys)
+        if not isinstance(keys_list, list):
+            raise ValueError("Keys must be a list")
+
+        metadata_dict = {}
+        if metadata:
+            metadata_dict = json.loads(metadata)
+
+        job_manager = get_job_manager()
+        job_id = job_manager.create_job()
+
+        file_paths = []
+        children = []
+        for upload in files:
+            child_id = job_manager.create_job()
+            # One folder per child job: same-name uploads in a batch must not overwrite each other
+            file_paths.append(await save_upload_file(upload, os.path.join(UPLOAD_DIR, child_id)))
+            job_manager.update_job_status(child_id, JobStatus.PENDING, {"parent_id": job_id, "filename": upload.filename})
+            children.append({"job_id": child_id, "filename": upload.filename})
+
+        job_manager.update_job_status(job_id, JobStatus.PENDING, {"children": children})
+        background_tasks.add_task(
+            process_batch_job, file_paths, keys_list, metadata_dict, job_id, [c["job_id"] for c in children]
+        )
+
+        return {
+            "status": "queued",
+            "job_id": job_id,
+            "children": children,
+            "message": f"{len(children)} files queued for processing."
+        }
+
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for keys or metadata")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/ingest/bulk", summary="Bulk ingest pre-extracted text or chunks (NDJSON)", dependencies=[Depends(require_writable)])
+async def ingest_bulk(
+    request: Request,
+    keys: Optional[str] = Query(None, description="JSON string list of default keys for lines without 'keys'")
+):
+    """
+    Stream newline-delimited JSON documents (already extracted text, or
+    chunks with optional precomputed vectors) straight into batched
+    embedding and bulk upserts. Responds when the whole body is stored.
+    """
+    try:
+        default_keys = json.loads(keys) if keys else []
+        if not isinstance(default_keys, list):
+            raise ValueError("Keys must be a list")
+    except (json.JSONDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid JSON format for keys")
+
+    job_id = get_job_manager().create_job()
+    try:
+        return await process_ndjson_stream(iter_lines(request.stream()), default_keys, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk job {job_id} failed: {e}")
+
 @app.get("/job/{job_id}", summary="Check Job Status")
 async def get_job_status(job_id: str):
-    from .processing.jobs import get_job_manager
     job_manager = get_job_manager()
     job = job_manager.get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
 
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@app.get("/job/{job_id}/events", summary="Stream job progress (SSE)")
+async def stream_job_status(job_id: str, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-sent events for one job: a snapshot first, then status, progress
+    and error events until the job finishes. Reconnecting clients resume
+    from the `Last-Event-ID` header.
+    """
+    if not get_job_manager().get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(
+        stream_job_events([job_id], _parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.get("/jobs/events", summary="Stream progress of several jobs (SSE)")
+async def stream_jobs_status(
+    ids: str = Query(..., description="Comma separated job IDs"),
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Multiplexed server-sent events for many jobs over one connection.
+    Every event carries its `job_id`. The stream ends when all jobs are done.
+    """
+    job_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="No job IDs given")
+    return StreamingResponse(
+        stream_job_events(job_ids, _parse_last_event_id(last_event_id)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@app.get("/jobs", summary="List recent jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 100):
+    """
+    List the most recently updated jobs, optionally filtered by status
+    (e.g. `?status=PROCESSING` for running jobs).
+    """
+    if status is not None and status not in JobStatus.__members__:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    job_manager = get_job_manager()
+    jobs = job_manager.list_jobs(status=JobStatus(status) if status else None, limit=min(limit, 1000))
+    return {"jobs": jobs}
+
 @app.post("/search", response_model=SearchResponse, summary="Search for information")
 async def search_documents(query: SearchQuery):
     """
     Search specifically within documents that match the provided filter keys.
     """
     try:
-        from .storage.embeddings import get_embedding_service
-        from .storage.vector_db import get_vector_db
-        
-        # 1. Embed Query
-        embed_service = get_embedding_service()
-        query_vector = embed_service.embed_text(query.query)
-        
-        # 2. Search DB
-        vector_db = get_vector_db()
-        search_results = vector_db.search(
-            query_vector=query_vector,
-            filter_keys=query.filter_keys,
-            exclude_keys=query.exclude_keys,
-            top_k=query.top_k
-        )
-        
-        # 3. Format Response
-        formatted_results = []
-        for hit in search_results:
-            formatted_results.append(SearchResultChunk(
-                text=hit.payload.get("text", ""),
-                score=hit.score,
-                metadata=hit.payload
-            ))
-            
-        return SearchResponse(results=formatted_results)
-        
+        return await asyncio.to_thread(run_search, query)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/stream", summary="Stream search results as NDJSON")
+async def search_documents_stream(
+    query: SearchQuery,
+    limit: int = Query(1000, ge=1, le=MAX_STREAM_RESULTS, description="Maximum number of results to stream")
+):
+    """
+    Stream up to `limit` results (top_k is ignored), one JSON object per
+    line, fetched from the vector store page by page.
+    """
+    try:
+        decode_cursor(query, query.cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(stream_search(query, limit), media_type="application/x-ndjson")
+
+@app.post("/documents/delete", response_model=DeleteResponse, summary="Delete documents", dependencies=[Depends(require_writable)])
+async def delete_documents_endpoint(request: DeleteRequest):
+    """
+    Delete chunks by document, key and/or age, plus the stored uploads no
+    longer referenced. Criteria are combined (all must match).
+    """
+    filters = []
+    extra_files = []
+    if request.filename:
+        filters.append(file_filter(request.filename))
+        extra_files.append(os.path.abspath(os.path.join(UPLOAD_DIR, os.path.basename(request.filename))))
+    if request.keys:
+        filters.append(keys_filter(request.keys))
+    if request.ingested_before:
+        filters.append(ingested_before_filter(request.ingested_before.timestamp()))
+    if request.older_than_days:
+        filters.append(ingested_before_filter(time.time() - request.older_than_days * 24 * 3600))
+    if not filters:
+        raise HTTPException(status_code=400, detail="Provide filename, keys, ingested_before or older_than_days")
+
+    try:
+        result = await asyncio.to_thread(delete_documents, combine_filters(filters), extra_files)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return DeleteResponse(**result)
+
 @app.get("/keys", summary="List all available keys")
 async def list_keys():
     """
@@ -133,3 +358,169 @@ async def list_keys():
     """
     # TODO: Fetch unique keys from DB
     return {"keys": ["mock_key_1", "mock_key_2"]}
+
+# --- Admin: live diagnostics (disabled unless ROG_ADMIN_TOKEN is set) ---
+
+@app.post("/admin/profile", summary="Profile the running process", dependencies=[Depends(require_admin)])
+async def profile_process(
+    seconds: float = Query(10, gt=0, description="How long to profile"),
+    mode: str = Query("sampling", description="'sampling' (all threads) or 'cprofile' (event loop thread)"),
+    format: str = Query(None, description="sampling: 'collapsed'; cprofile: 'pstats' or 'text'")
+):
+    """
+    Capture a profile of whatever the process does during the next `seconds`.
+    """
+    if seconds > profiling.MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be <= {profiling.MAX_PROFILE_SECONDS}")
+    formats = {"sampling": ("collapsed",), "cprofile": ("pstats", "text")}
+    if mode not in formats:
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode}")
+    format = format or formats[mode][0]
+    if format not in formats[mode]:
+        raise HTTPException(status_code=400, detail=f"Format for {mode} must be one of {formats[mode]}")
+    if profiling.profile_lock.locked():
+        raise HTTPException(status_code=409, detail="Another profile is running")
+
+    async with profiling.profile_lock:
+        if mode == "sampling":
+            counts = await asyncio.to_thread(profiling.sample_stacks, seconds)
+            return PlainTextResponse(profiling.collapsed_text(counts))
+        profiler = await profiling.cprofile_event_loop(seconds)
+        if format == "text":
+            return PlainTextResponse(profiling.pstats_text(profiler))
+        return Response(
+            content=profiling.pstats_bytes(profiler),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="rog.pstats"'}
+        )
+
+@app.post("/admin/trace/search", summary="Run one search with call tracing", dependencies=[Depends(require_admin)])
+async def trace_search(query: SearchQuery, min_ms: float = Query(0.5, ge=0)):
+    """
+    Run a search with a call-tree tracer and return results plus the tree.
+    """
+    if profiling.profile_lock.locked():
+        raise HTTPException(status_code=409, detail="Another profile is running")
+    async with profiling.profile_lock:
+        tracer = profiling.CallTreeTracer()
+        started = time.perf_counter()
+        response = await asyncio.to_thread(tracer.run, run_search, query)
+        elapsed = time.perf_counter() - started
+    return {
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "results": response.results,
+        "call_tree": tracer.tree(min_ms)
+    }
+
+@app.post("/admin/trace/ingest", summary="Ingest one document with call tracing", dependencies=[Depends(require_admin), Depends(require_writable)])
+async def trace_ingest(
+    file: UploadFile = File(...),
+    keys: str = Form(..., description="JSON string list of keys"),
+    metadata: Optional[str] = Form(None, description="JSON string metadata"),
+    min_ms: float = Query(0.5, ge=0)
+):
+    """
+    Ingest a file synchronously under the call-tree tracer (loader,
+    chunking, embedding and upsert threads) and return the job and the tree.
+    """
+    try:
+        keys_list = json.loads(keys)
+        metadata_dict = json.loads(metadata) if metadata else {}
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON format for keys or metadata")
+    if profiling.profile_lock.locked():
+        raise HTTPException(status_code=409, detail="Another profile is running")
+
+    async with profiling.profile_lock:
+        job_manager = get_job_manager()
+        job_id = job_manager.create_job()
+        file_path = await save_upload_file(file)
+        tracer = profiling.CallTreeTracer()
+        started = time.perf_counter()
+        await asyncio.to_thread(
+            tracer.run_coroutine, lambda: process_job(file_path, keys_list, metadata_dict, job_id)
+        )
+        elapsed = time.perf_counter() - started
+    return {
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "job": job_manager.get_job(job_id),
+        "call_tree": tracer.tree(min_ms)
+    }
+
+# --- Admin: storage maintenance ---
+
+@app.post("/admin/retention", summary="Run the retention policy now", dependencies=[Depends(require_admin), Depends(require_writable)])
+async def run_retention(days: Optional[float] = Query(None, gt=0, description="Override ROG_RETENTION_DAYS")):
+    """
+    Delete documents older than the retention period, remove stale uploads,
+    evict old jobs and compact storage.
+    """
+    if days is None and RETENTION_DAYS <= 0:
+        raise HTTPException(status_code=400, detail="Retention is disabled; set ROG_RETENTION_DAYS or pass days")
+    return await asyncio.to_thread(apply_retention, days)
+
+@app.post("/admin/compact", summary="Compact on-disk storage", dependencies=[Depends(require_admin), Depends(require_writable)])
+async def compact():
+    """
+    Reclaim the space of deleted points and evicted jobs.
+    """
+    return await asyncio.to_thread(compact_storage)
+
+def _snapshot_path(name: str) -> str:
+    # Snapshots live directly under SNAPSHOT_DIR
+    if not name or name != os.path.basename(name) or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid snapshot name")
+    return os.path.join(SNAPSHOT_DIR, name)
+
+@app.get("/admin/snapshots", summary="List snapshots", dependencies=[Depends(require_admin)])
+async def list_snapshots():
+    snapshots = []
+    if os.path.isdir(SNAPSHOT_DIR):
+        for name in sorted(os.listdir(SNAPSHOT_DIR)):
+            manifest_path = os.path.join(SNAPSHOT_DIR, name, MANIFEST_FILE)
+            if os.path.isfile(manifest_path):
+                with open(manifest_path, encoding="utf-8") as f:
+                    snapshots.append({"name": name, **json.load(f)})
+    return {"snapshots": snapshots}
+
+@app.post("/admin/snapshot/export", summary="Export a snapshot", dependencies=[Depends(require_admin), Depends(require_writable)])
+async def snapshot_export(name: Optional[str] = Query(None, description="Defaults to a UTC timestamp")):
+    """
+    Write all points (vectors, payloads, key catalog) to SNAPSHOT_DIR/name.
+    """
+    name = name or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    path = _snapshot_path(name)
+    if os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"Snapshot {name} already exists")
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    manifest = await asyncio.to_thread(export_snapshot, path)
+    return {"name": name, **manifest}
+
+@app.post("/admin/snapshot/import", summary="Import a snapshot", dependencies=[Depends(require_admin), Depends(require_writable)])
+async def snapshot_import(
+    name: str = Query(..., description="Snapshot under SNAPSHOT_DIR"),
+    merge: bool = Query(False, description="Keep existing points instead of replacing them")
+):
+    """
+    Load a snapshot into the vector store (replacing its contents by default).
+    A writer publishes the imported store to the readers right away.
+    """
+    path = _snapshot_path(name)
+    if not os.path.isfile(os.path.join(path, MANIFEST_FILE)):
+        raise HTTPException(status_code=404, detail=f"Snapshot {name} not found")
+    try:
+        result = await asyncio.to_thread(import_snapshot, path, not merge)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if ROLE == "writer":
+        result["generation"] = (await asyncio.to_thread(publish_generation))["generation"]
+    return result
+
+@app.post("/admin/publish", summary="Publish an index generation for readers",
+          dependencies=[Depends(require_admin), Depends(require_writable)])
+async def publish():
+    """
+    Export the store as a new generation and switch readers to it now,
+    instead of waiting for the writer's publish interval.
+    """
+    return await asyncio.to_thread(publish_generation)
@@ -1,5 +1,10 @@
+import os
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from datetime import datetime
+
+# Upper bound for SearchQuery.top_k; larger exports use cursors or /search/stream
+MAX_TOP_K = int(os.getenv("ROG_MAX_TOP_K", "100"))
 
 class IngestMetadata(BaseModel):
     source_id: Optional[str] = Field(None, description="Unique identifier for the source document")
@@ -19,12 +24,41 @@ class SearchQuery(BaseModel):
     query: str = Field(..., description="Natural language query string")
     filter_keys: Optional[List[str]] = Field(None, description="List of keys to filter by (must contain at least one)")
     exclude_keys: Optional[List[str]] = Field(None, description="List of keys to exclude")
-    top_k: int = Field(5, description="Number of results to return")
+    top_k: int = Field(5, ge=1, le=MAX_TOP_K, description="Number of results to return (page size)")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    # Location scope: only chunks from these pages / slides / sheet rows / archive members
+    page_from: Optional[int] = Field(None, ge=1, description="First page (PDF)")
+    page_to: Optional[int] = Field(None, ge=1, description="Last page (PDF)")
+    slide_from: Optional[int] = Field(None, ge=1, description="First slide (PPTX)")
+    slide_to: Optional[int] = Field(None, ge=1, description="Last slide (PPTX)")
+    sheet: Optional[str] = Field(None, description="Sheet name (XLSX)")
+    row_from: Optional[int] = Field(None, ge=1, description="First row (XLSX)")
+    row_to: Optional[int] = Field(None, ge=1, description="Last row (XLSX)")
+    source_file: Optional[str] = Field(None, description="File inside an archive (ZIP)")
+
+    def scope(self) -> Dict[str, Any]:
+        """
+        The location scope fields that are set.
+        """
+        fields = ("page_from", "page_to", "slide_from", "slide_to", "sheet", "row_from", "row_to", "source_file")
+        return {name: getattr(self, name) for name in fields if getattr(self, name) is not None}
 
 class SearchResultChunk(BaseModel):
     text: str
     score: float
     metadata: Dict[str, Any]
+    citation: Optional[str] = Field(None, description='Where the chunk comes from, e.g. "report.pdf, p. 3-4"')
 
 class SearchResponse(BaseModel):
     results: List[SearchResultChunk]
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to get the next page; null on the last page")
+
+class DeleteRequest(BaseModel):
+    filename: Optional[str] = Field(None, description="Delete the chunks of this document (upload name, stored path or bulk filename)")
+    keys: Optional[List[str]] = Field(None, description="Delete chunks tagged with any of these keys")
+    ingested_before: Optional[datetime] = Field(None, description="Delete chunks ingested before this time")
+    older_than_days: Optional[float] = Field(None, gt=0, description="Delete chunks ingested more than this many days ago")
+
+class DeleteResponse(BaseModel):
+    points_deleted: int
+    files_removed: List[str]
@@ -0,0 +1,90 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+import logging
+from ..metrics import timed, BATCHER_PENDING
+
+logger = logging.getLogger("rog.batching")
+
+# Chunks collected before one embed_batch + upsert round trip
+EMBED_BATCH_SIZE = int(os.getenv("ROG_EMBED_BATCH_SIZE", "256"))
+
+
+class ChunkBatcher:
+    """
+    Collects chunks from one or many documents and writes them in large
+    batches: one embed_batch call for the chunks without a precomputed
+    vector, then one bulk upsert. Embedding and upsert run in a worker
+    thread so the event loop keeps serving requests.
+
+    Chunks can be tagged (e.g. with a child job id); on_flush receives
+    per-tag counters of embedded and upserted chunks after every flush.
+    When a flush fails, on_error receives the per-tag counters of the lost
+    chunks and the exception, which is then re-raised to the caller.
+    """
+    def __init__(self, batch_size: int = EMBED_BATCH_SIZE,
+                 on_flush: Optional[Callable[[Counter, Counter], None]] = None,
+                 on_error: Optional[Callable[[Counter, Exception], None]] = None):
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self.on_error = on_error
+        self._texts: List[str] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._vectors: List[Optional[List[float]]] = []
+        self._tags: List[Any] = []
+        self.total_embedded = 0
+        self.total_upserted = 0
+        # Cumulative embed/upsert seconds of this batcher
+        self.timings: Dict[str, float] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._payloads)
+
+    async def add(self, text: str, payload: Dict[str, Any], vector: Optional[List[float]] = None, tag: Any = None):
+        self._texts.append(text)
+        self._payloads.append(payload)
+        self._vectors.append(vector)
+        self._tags.append(tag)
+        BATCHER_PENDING.inc()
+        if self.pending >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self._payloads:
+            return
+        batch = (self._texts, self._payloads, self._vectors, self._tags)
+        self._texts, self._payloads, self._vectors, self._tags = [], [], [], []
+        try:
+            await asyncio.to_thread(self._write, *batch)
+        except Exception as e:
+            if self.on_error:
+                self.on_error(Counter(batch[3]), e)
+            raise
+        finally:
+            BATCHER_PENDING.dec(len(batch[1]))
+
+    def _write(self, texts: List[str], payloads: List[Dict[str, Any]],
+               vectors: List[Optional[List[float]]], tags: List[Any]):
+        from ..storage.embeddings import get_embedding_service
+        from ..storage.vector_db import get_vector_db
+
+        embedded = Counter()
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            with timed("embed", self.timings):
+                new_vectors = get_embedding_service().embed_batch([texts[i] for i in missing])
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = vector
+                embedded[tags[i]] += 1
+
+        with timed("upsert", self.timings):
+            get_vector_db().upsert_points(vectors, payloads)
+        upserted = Counter(tags)
+
+        self.total_embedded += len(missing)
+        self.total_upserted += len(payloads)
+        logger.info(f"Flushed {len(payloads)} chunks ({len(missing)} embedded)")
+        if self.on_flush:
+            self.on_flush(embedded, upserted)
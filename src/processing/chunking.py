@@ -1,39 +1,122 @@
-from typing import List
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
 
 def recursive_character_chunking(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
     """
-    Splits text into chunks of approximately chunk_size characters, 
+    Splits text into chunks of approximately chunk_size characters,
     respecting sentence boundaries where possible.
     """
+    return [chunk for chunk, _, _ in chunk_with_offsets(text, chunk_size, overlap)]
+
+def chunk_with_offsets(text: str, chunk_size: int = 1000, overlap: int = 100,
+                       boundaries: Optional[List[int]] = None) -> List[Tuple[str, int, int]]:
+    """
+    Same chunks as recursive_character_chunking, with the [start, end)
+    character offsets of each (stripped) chunk in `text`. No chunk crosses
+    one of the `boundaries` (character offsets).
+    """
     if not text:
         return []
-        
+
     chunks = []
-    start = 0
-    text_len = len(text)
-    
+    cuts = sorted(b for b in set(boundaries or []) if 0 < b < len(text))
+    for segment_start, segment_end in zip([0] + cuts, cuts + [len(text)]):
+        chunks.extend(_chunk_segment(text, segment_start, segment_end, chunk_size, overlap))
+    return chunks
+
+def _chunk_segment(text: str, start: int, text_len: int, chunk_size: int, overlap: int) -> List[Tuple[str, int, int]]:
+    """
+    Chunks of text[start:text_len], with offsets in `text`.
+    """
+    chunks = []
+
     while start < text_len:
         end = start + chunk_size
-        
+
         # If we are not at the end of the text, try to find a natural break point
         if end < text_len:
             # Look for the last period or newline within the window
             # to avoid cutting words/sentences in half arbitrarily
             lookback_window = text[start:end]
             last_break = max(
-                lookback_window.rfind('. '), 
+                lookback_window.rfind('. '),
                 lookback_window.rfind('\n')
             )
-            
+
             if last_break != -1:
                 end = start + last_break + 1 # Include the punctuation/newline
-        
-        chunk = text[start:end].strip()
+
+        raw = text[start:min(end, text_len)]
+        chunk = raw.strip()
         if chunk:
-            chunks.append(chunk)
-            
-        start = end - overlap
-        if start < 0: # Should not happen unless chunk_size < overlap
-             start = 0
-             
+            chunk_start = start + (len(raw) - len(raw.lstrip()))
+            chunks.append((chunk, chunk_start, chunk_start + len(chunk)))
+
+        # An early break point would move start backwards (and loop forever): drop the overlap then
+        start = end - overlap if end - overlap > start else end
+
     return chunks
+
+# Numbered locations that only make sense within a group: rows restart in every sheet
+GROUPED_RANGES = {"row": "sheet"}
+# Locations no chunk may straddle: pages and slides of two archive members must not merge
+SEPARATE_LOCATIONS = ("source_file",)
+
+class SpanIndex:
+    """
+    Locations (page, slide, sheet/row, archive member) of character ranges
+    of the extracted text, as reported by the loaders in "spans":
+    [{"start": 0, "end": 1200, "page": 1}, ...].
+    locate() turns the spans a chunk overlaps into payload fields:
+    numbers become <name>_start/<name>_end ranges, strings a <name>s list.
+    Chunks split at boundaries() never mix rows of different sheets or
+    two archive members.
+    """
+    def __init__(self, spans: Optional[List[Dict[str, Any]]]):
+        # Spans of one kind (same attributes) do not overlap, so each kind is searchable by bisection
+        self._kinds: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for span in spans or []:
+            kind = tuple(sorted(k for k in span if k not in ("start", "end")))
+            self._kinds.setdefault(kind, []).append(span)
+        self._bounds = {}
+        for kind, kind_spans in self._kinds.items():
+            kind_spans.sort(key=lambda s: s["start"])
+            self._bounds[kind] = ([s["start"] for s in kind_spans], [s["end"] for s in kind_spans])
+
+    def boundaries(self) -> List[int]:
+        """
+        Offsets where a new group of a GROUPED_RANGES location starts (a new
+        sheet, or the same sheet name again with its rows restarting) and
+        where a new archive member starts. The cut is right after the last
+        span of the previous group, so a sheet or file heading goes with the
+        text it introduces.
+        """
+        cuts = set()
+        for name in SEPARATE_LOCATIONS:
+            spans = self._kinds.get((name,), [])
+            for previous, span in zip(spans, spans[1:]):
+                cuts.add(previous["end"])
+        for kind, kind_spans in self._kinds.items():
+            for name, group in GROUPED_RANGES.items():
+                if name not in kind or group not in kind:
+                    continue
+                for previous, span in zip(kind_spans, kind_spans[1:]):
+                    if span[group] != previous[group] or span[name] <= previous[name]:
+                        cuts.add(previous["end"])
+        return sorted(cuts)
+
+    def locate(self, start: int, end: int) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {}
+        for kind, kind_spans in self._kinds.items():
+            starts, ends = self._bounds[kind]
+            overlapping = kind_spans[bisect_right(ends, start):bisect_left(starts, end)]
+            for name in kind:
+                values = [s[name] for s in overlapping if s.get(name) is not None]
+                if not values:
+                    continue
+                if isinstance(values[0], (int, float)):
+                    fields[f"{name}_start"] = min(values)
+                    fields[f"{name}_end"] = max(values)
+                else:
+                    fields[f"{name}s"] = list(dict.fromkeys(values))
+        return fields
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Set
+import logging
+
+logger = logging.getLogger("rog.events")
+
+EVENT_HISTORY_SIZE = int(os.getenv("ROG_EVENT_HISTORY_SIZE", "10000"))
+SUBSCRIBER_QUEUE_SIZE = 1000
+HEARTBEAT_SECONDS = float(os.getenv("ROG_SSE_HEARTBEAT_SECONDS", "15"))
+
+
+class _Subscriber:
+    """
+    One SSE stream. Events may be published from worker threads, so they are
+    handed over to the subscriber's event loop thread-safely.
+    """
+    def __init__(self, job_ids: Set[str], loop: asyncio.AbstractEventLoop):
+        self.job_ids = job_ids
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when events were dropped because the consumer is too slow
+        self.lagged = False
+
+    def _put(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    def deliver(self, event: Dict[str, Any]):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._put(event)
+        else:
+            try:
+                self.loop.call_soon_threadsafe(self._put, event)
+            except RuntimeError:
+                # Loop already closed, stream is gone
+                pass
+
+
+class JobEventBus:
+    """
+    In-process pub/sub for job events.
+    Every event gets a process-wide increasing id; the last events are kept
+    in a bounded ring so reconnecting clients can resume via Last-Event-ID.
+    """
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._history: deque = deque(maxlen=history_size)
+        self._subscribers: Dict[str, Set[_Subscriber]] = {}
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._last_id += 1
+            record = {"id": self._last_id, "job_id": job_id, "event": event, "data": data}
+            self._history.append(record)
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for sub in subscribers:
+            sub.deliver(record)
+        return record
+
+    def subscribe(self, job_ids: List[str]) -> _Subscriber:
+        sub = _Subscriber(set(job_ids), asyncio.get_running_loop())
+        with self._lock:
+            for job_id in sub.job_ids:
+                self._subscribers.setdefault(job_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber):
+        with self._lock:
+            for job_id in sub.job_ids:
+                subs = self._subscribers.get(job_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[job_id]
+
+    def replay(self, job_ids: List[str], after_id: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Events for job_ids newer than after_id, or None if the history no
+        longer covers that range (evicted, or an id from before a restart).
+        """
+        wanted = set(job_ids)
+        with self._lock:
+            if after_id > self._last_id:
+                return None
+            oldest = self._history[0]["id"] if self._history else self._last_id + 1
+            if after_id + 1 < oldest:
+                return None
+            return [e for e in self._history if e["id"] > after_id and e["job_id"] in wanted]
+
+
+def format_sse(record: Dict[str, Any]) -> str:
+    payload = {"job_id": record["job_id"], **record["data"]}
+    return f"id: {record['id']}\nevent: {record['event']}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def stream_job_events(job_ids: List[str], last_event_id: Optional[int] = None,
+                            heartbeat_seconds: float = HEARTBEAT_SECONDS):
+    """
+    Async generator of SSE frames for one or more jobs.
+    Starts with a snapshot of each job (or a replay when resuming), then
+    pushes live events. Heartbeats also re-check the job store, which picks
+    up jobs running in other worker processes. Ends when all jobs are done.
+    """
+    from .jobs import get_job_manager, TERMINAL_STATUSES
+    bus = get_event_bus()
+    job_manager = get_job_manager()
+    terminal = {s.value for s in TERMINAL_STATUSES}
+
+    pending = set(job_ids)
+    last_seen: Dict[str, Any] = {}
+
+    def snapshot(job_id: str) -> str:
+        job = job_manager.get_job(job_id)
+        if job is None:
+            pending.discard(job_id)
+            record = {"id": bus.last_id, "job_id": job_id, "event": "not_found", "data": {}}
+        else:
+            last_seen[job_id] = job.get("updated_at")
+            if job["status"] in terminal:
+                pending.discard(job_id)
+            record = {"id": bus.last_id, "job_id": job_id, "event": "snapshot", "data": {"job": job}}
+        return format_sse(record)
+
+    def track(record: Dict[str, Any]):
+        data = record["data"]
+        if "updated_at" in data:
+            last_seen[record["job_id"]] = data["updated_at"]
+        if record["event"] == "status" and data.get("status") in terminal:
+            pending.discard(record["job_id"])
+
+    sub = bus.subscribe(job_ids)
+    try:
+        sent_id = 0
+        replayed = None
+        if last_event_id is not None:
+            from ..metrics import CACHE_REQUESTS
+            replayed = bus.replay(job_ids, last_event_id)
+            CACHE_REQUESTS.inc(cache="sse_replay", result="miss" if replayed is None else "hit")
+        if replayed is None:
+            for job_id in job_ids:
+                yield snapshot(job_id)
+        else:
+            for record in replayed:
+                track(record)
+                sent_id = record["id"]
+                yield format_sse(record)
+            # Jobs already finished before the replay window leave nothing to wait for
+            for job_id in list(pending):
+                job = job_manager.get_job(job_id)
+                if job is None or job["status"] in terminal:
+                    yield snapshot(job_id)
+
+        loop = asyncio.get_running_loop()
+        next_beat = loop.time() + heartbeat_seconds
+        while pending:
+            if sub.lagged:
+                sub.lagged = False
+                for job_id in list(pending):
+                    yield snapshot(job_id)
+                continue
+
+            try:
+                record = await asyncio.wait_for(sub.queue.get(), timeout=max(0.0, next_beat - loop.time()))
+            except asyncio.TimeoutError:
+                record = None
+
+            if record is not None:
+                if record["id"] <= sent_id:
+                    continue  # Already delivered by the replay
+                track(record)
+                sent_id = record["id"]
+                yield format_sse(record)
+
+            if loop.time() >= next_beat:
+                next_beat = loop.time() + heartbeat_seconds
+                yield f": heartbeat {int(time.time())}\n\n"
+                # Catch changes made by other workers
+                for job_id in list(pending):
+                    job = job_manager.get_job(job_id)
+                    if job is None or job.get("updated_at") != last_seen.get(job_id):
+                        yield snapshot(job_id)
+    finally:
+        bus.unsubscribe(sub)
+
+
+# Singleton
+_event_bus = None
+
+def get_event_bus():
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = JobEventBus()
+    return _event_bus
@@ -1,20 +1,28 @@
+import asyncio
+import json
 import os
 import shutil
 from fastapi import UploadFile, HTTPException
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional
 import logging
+from datetime import datetime
+from .batching import ChunkBatcher
+from ..metrics import timed, INGEST_BYTES, INGEST_PAGES, INGEST_CHUNKS, JOBS_ACTIVE
 
 UPLOAD_DIR = "data/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Bad lines of a bulk ingest kept in the job record; the rest are only counted
+MAX_BULK_ERRORS = int(os.getenv("ROG_BULK_MAX_ERRORS", "100"))
 
 logger = logging.getLogger("rog.ingest")
 
 async def save_upload_file(upload_file: UploadFile, destination_folder: str = UPLOAD_DIR) -> str:
     """
-    Saves the uploaded file to disk.
+    Saves the uploaded file to disk, keeping the client's file name.
     """
     try:
-        file_path = os.path.join(destination_folder, upload_file.filename)
+        os.makedirs(destination_folder, exist_ok=True)
+        file_path = os.path.join(destination_folder, os.path.basename(upload_file.filename))
         with open(file_path, "wb") as buffer:
             shutil.copyfileobj(upload_file.file, buffer)
         return os.path.abspath(file_path)
@@ -22,80 +30,143 @@ async def save_upload_file(upload_file: UploadFile, destination_folder: str = UP
         logger.error(f"Failed to save file: {e}")
         raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
 
-async def process_file_path(file_path: str, keys: List[str], metadata: Dict[str, Any], job_id: str, depth: int = 0):
+def extract_file(file_path: str, timings: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Any]]:
     """
-    Process a local file path. Handles specific file types and recursion.
+    Run the loader matching the file extension.
+    Returns None for unsupported file types.
     """
-    from .jobs import get_job_manager
-    job_manager = get_job_manager()
-
-    if depth > 3: # Safety limit for recursion
-        logger.warning(f"Max recursion depth reached for {file_path}")
-        job_manager.add_error(job_id, "max_depth_reached", file_path)
-        return {"status": "skipped", "reason": "max_depth"}
-
-    logger.info(f"Processing file: {file_path}")
     filename = os.path.basename(file_path).lower()
-    
-    extraction_result = {"text": "", "pages": []}
-    
+    file_type = filename.split('.')[-1]
+
     if filename.endswith(".pdf"):
         from .loaders.pdf_loader import load_pdf
-        extraction_result = load_pdf(file_path)
+        with timed("load_pdf", timings):
+            extraction_result = load_pdf(file_path)
+        INGEST_PAGES.inc(len(extraction_result.get("pages") or []))
         if extraction_result.get("needs_ocr"):
             logger.info(f"PDF {filename} needs OCR.")
             
     elif filename.endswith(".zip"):
         from .loaders.archive_loader import load_archive
         # Configurable limit? hardcode 50 for now
-        extraction_result = load_archive(file_path, max_files=50)
+        with timed("load_archive", timings):
+            extraction_result = load_archive(file_path, max_files=50)
+
+    elif filename.endswith((".docx", ".xlsx", ".pptx")):
+        from .loaders import office_loader
+        loader = {"docx": office_loader.load_docx, "xlsx": office_loader.load_xlsx, "pptx": office_loader.load_pptx}[file_type]
+        with timed(f"load_{file_type}", timings):
+            extraction_result = loader(file_path)
 
     elif filename.endswith((".txt", ".md", ".json", ".csv", ".xml", ".py", ".js")):
         from .loaders.text_loader import load_text
-        extraction_result = load_text(file_path)
-        
+        with timed("load_text", timings):
+            extraction_result = load_text(file_path)
+
     else:
+        return None
+
+    try:
+        INGEST_BYTES.inc(os.path.getsize(file_path), file_type=file_type)
+    except OSError:
+        pass
+    return extraction_result
+
+async def process_file_path(file_path: str, keys: List[str], metadata: Dict[str, Any], job_id: str, depth: int = 0,
+                            batcher: Optional[ChunkBatcher] = None):
+    """
+    Process a local file path. Handles specific file types and recursion.
+    Chunks go through `batcher` when given (shared by a multi-file job),
+    otherwise through a batcher owned by this call.
+    """
+    from .jobs import get_job_manager
+    job_manager = get_job_manager()
+
+    if depth > 3: # Safety limit for recursion
+        logger.warning(f"Max recursion depth reached for {file_path}")
+        job_manager.add_error(job_id, "max_depth_reached", file_path)
+        return {"status": "skipped", "reason": "max_depth"}
+
+    logger.info(f"Processing file: {file_path}")
+    filename = os.path.basename(file_path).lower()
+    
+    timings: Dict[str, float] = {}
+
+    # Loaders are blocking, keep them off the event loop
+    extraction_result = await asyncio.to_thread(extract_file, file_path, timings)
+    if extraction_result is None:
         logger.warning(f"Unsupported file type: {filename}")
         return {"status": "skipped", "reason": "unsupported_type"}
     
+    job_manager.update_progress(job_id, "extracted", pages_parsed=len(extraction_result.get("pages") or []))
+
     # If text was extracted, proceed to storage
     full_text = extraction_result.get("text", "")
+    chunks = []
     if full_text:
-        from .chunking import recursive_character_chunking
-        from ..storage.embeddings import get_embedding_service
-        from ..storage.vector_db import get_vector_db
+        from .chunking import chunk_with_offsets, SpanIndex
+        from ..storage.vector_db import build_payload
         
-        # 1. Chunking
-        chunks = recursive_character_chunking(full_text)
+        # 1. Chunking, keeping where each chunk comes from (pages, slides, sheet rows, archive members)
+        with timed("chunking", timings):
+            span_index = SpanIndex(extraction_result.get("spans"))
+            chunk_spans = chunk_with_offsets(full_text, boundaries=span_index.boundaries())
+            chunks = [chunk for chunk, _, _ in chunk_spans]
+        INGEST_CHUNKS.inc(len(chunks))
         logger.info(f"Generated {len(chunks)} chunks for {filename}")
+        job_manager.update_progress(job_id, "chunked", chunks_total=len(chunks))
         
         if chunks:
-            # 2. Embedding
-            embed_service = get_embedding_service()
-            embeddings = embed_service.embed_batch(chunks)
-            
-            # 3. Storage
-            vector_db = get_vector_db()
-            vector_db.upsert_chunks(
-                chunks=chunks,
-                embeddings=embeddings,
-                keys=keys,
-                metadata={
-                    "original_file": file_path,
-                    "file_type": filename.split('.')[-1],
-                    **metadata
-                },
-                filename=filename
-            )
+            # 2. Embedding + 3. Storage, batched
+            own_batcher = batcher is None
+            if own_batcher:
+                batcher = ChunkBatcher(on_flush=lambda embedded, upserted: job_manager.update_progress(
+                    job_id, "upserted", increment=True,
+                    chunks_embedded=embedded[job_id], points_upserted=upserted[job_id]
+                ))
+
+            file_metadata = {
+                "original_file": file_path,
+                "file_type": filename.split('.')[-1],
+                **metadata
+            }
+            for i, (chunk, start, end) in enumerate(chunk_spans):
+                chunk_metadata = {**file_metadata, **span_index.locate(start, end)}
+                await batcher.add(chunk, build_payload(chunk, keys, filename, i, chunk_metadata), tag=job_id)
+
+            if own_batcher:
+                await batcher.flush()
+                timings.update(batcher.timings)
+                logger.info(f"Upserted {len(chunks)} chunks for {filename}")
     
     return {
         "file_path": file_path,
         "status": "processed",
         "keys": keys,
-        "chunk_count": len(chunks) if full_text else 0,
-        "result": extraction_result
+        "chunk_count": len(chunks),
+        "extraction": summarize_extraction(extraction_result),
+        "timings": timings
     }
 
+def summarize_extraction(extraction_result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact view of a loader result for the job record.
+    The extracted text itself lives in the vector store, not in the job.
+    """
+    summary = {
+        "status": extraction_result.get("status"),
+        "text_length": len(extraction_result.get("text", "")),
+    }
+    if extraction_result.get("pages"):
+        summary["page_count"] = len(extraction_result["pages"])
+    if extraction_result.get("needs_ocr"):
+        summary["needs_ocr"] = True
+    if extraction_result.get("error"):
+        summary["error"] = extraction_result["error"]
+    if extraction_result.get("metadata"):
+        summary["metadata"] = extraction_result["metadata"]
+    return summary
+
 async def process_job(file_path: str, keys: List[str], metadata: Dict[str, Any], job_id: str):
     """
     Wrapper to handle the full lifecycle of a background job.
@@ -103,14 +174,16 @@ async def process_job(file_path: str, keys: List[str], metadata: Dict[str, Any],
     from .jobs import get_job_manager, JobStatus
     job_manager = get_job_manager()
     
+    JOBS_ACTIVE.inc()
     try:
         job_manager.update_job_status(job_id, JobStatus.PROCESSING)
         
         # Process
         result = await process_file_path(file_path, keys, metadata, job_id)
+        timings = result.pop("timings", {})
         
         # Check errors
-        job_errors = job_manager.get_job(job_id).get("errors", [])
+        job_errors = (job_manager.get_job(job_id) or {}).get("errors", [])
         final_status = JobStatus.COMPLETED
         
         if job_errors:
@@ -119,9 +192,247 @@ async def process_job(file_path: str, keys: List[str], metadata: Dict[str, Any],
              else:
                  final_status = JobStatus.PARTIAL
         
-        job_manager.update_job_status(job_id, final_status, {"result": result})
+        job_manager.update_job_status(job_id, final_status, {"result": result, "timings": timings})
         
     except Exception as e:
         logger.error(f"Job {job_id} failed logic: {e}")
         job_manager.update_job_status(job_id, JobStatus.FAILED, {"error": str(e)})
         job_manager.add_error(job_id, str(e))
+    finally:
+        JOBS_ACTIVE.dec()
+
+async def process_batch_job(file_paths: List[str], keys: List[str], metadata: Dict[str, Any], job_id: str,
+                            child_job_ids: List[str]):
+    """
+    Process several uploaded files as one parent job.
+    Each file has its own child job; all files share one ChunkBatcher so
+    chunks are embedded and upserted in large batches across documents.
+    """
+    from .jobs import get_job_manager, JobStatus
+    job_manager = get_job_manager()
+
+    children = {
+        child_id: {"file_path": path, "result": None, "flushed": 0, "done": False}
+        for child_id, path in zip(child_job_ids, file_paths)
+    }
+
+    failed = 0
+
+    def fail_child(child_id: str, error: str, result: Optional[Dict[str, Any]] = None):
+        nonlocal failed
+        child = children[child_id]
+        if child["done"]:
+            return
+        child["done"] = True
+        failed += 1
+        job_manager.add_error(job_id, error, child["file_path"])
+        job_manager.update_job_status(child_id, JobStatus.FAILED, {"result": result or {"status": "error", "error": error}})
+
+    def finish_child(child_id: str):
+        child = children[child_id]
+        if child["done"] or child["result"] is None or child["flushed"] < child["result"].get("chunk_count", 0):
+            return
+        child["done"] = True
+        timings = child["result"].pop("timings", {})
+        job_manager.update_job_status(child_id, JobStatus.COMPLETED, {"result": child["result"], "timings": timings})
+
+    def on_flush(embedded, upserted):
+        for child_id, count in upserted.items():
+            children[child_id]["flushed"] += count
+            job_manager.update_progress(
+                child_id, "upserted", increment=True,
+                chunks_embedded=embedded[child_id], points_upserted=count
+            )
+            finish_child(child_id)
+        job_manager.update_progress(
+            job_id, increment=True,
+            chunks_embedded=sum(embedded.values()), points_upserted=sum(upserted.values())
+        )
+
+    def on_flush_error(lost, error):
+        # A shared batch holds chunks of several children: all of them lost chunks
+        for child_id in lost:
+            fail_child(child_id, f"Storing chunks failed: {error}")
+
+    batcher = ChunkBatcher(on_flush=on_flush, on_error=on_flush_error)
+
+    JOBS_ACTIVE.inc()
+    try:
+        job_manager.update_job_status(job_id, JobStatus.PROCESSING)
+        job_manager.update_progress(job_id, "processing", files_total=len(file_paths), files_processed=0)
+
+        for child_id, child in children.items():
+            job_manager.update_job_status(child_id, JobStatus.PROCESSING)
+            try:
+                result = await process_file_path(child["file_path"], keys, metadata, child_id, batcher=batcher)
+            except Exception as e:
+                logger.error(f"Batch job {job_id}: {child['file_path']} failed: {e}")
+                result = {"file_path": child["file_path"], "status": "error", "error": str(e)}
+
+            if result.get("status") != "processed":
+                fail_child(child_id, result.get("error") or result.get("reason", "failed"), result)
+            else:
+                child["result"] = result
+                finish_child(child_id)
+            job_manager.update_progress(job_id, increment=True, files_processed=1)
+
+        try:
+            await batcher.flush()
+        except Exception as e:
+            logger.error(f"Batch job {job_id}: final flush failed: {e}")
+        # Children whose chunks never all reached the store
+        for child_id, child in children.items():
+            if not child["done"]:
+                fail_child(child_id, "Not all chunks were stored")
+
+        if failed == 0:
+            final_status = JobStatus.COMPLETED
+        elif failed < len(children):
+            final_status = JobStatus.PARTIAL
+        else:
+            final_status = JobStatus.FAILED
+
+        job_manager.update_job_status(job_id, final_status, {"result": {
+            "status": "processed",
+            "keys": keys,
+            "file_count": len(file_paths),
+            "failed_count": failed,
+            "chunk_count": batcher.total_upserted
+        }, "timings": batcher.timings})
+
+    except Exception as e:
+        logger.error(f"Batch job {job_id} failed logic: {e}")
+        for child_id, child in children.items():
+            if not child["done"]:
+                job_manager.update_job_status(child_id, JobStatus.FAILED, {"error": str(e)})
+        job_manager.update_job_status(job_id, JobStatus.FAILED, {"error": str(e)})
+        job_manager.add_error(job_id, str(e))
+    finally:
+        JOBS_ACTIVE.dec()
+
+async def process_ndjson_stream(lines: AsyncIterator[bytes], default_keys: List[str], job_id: str) -> Dict[str, Any]:
+    """
+    Bulk ingest of already extracted content, one JSON document per line:
+
+        {"text": "...", "keys": [...], "metadata": {...}, "filename": "..."}
+        {"chunks": ["...", "..."], "vectors": [[...], [...]], "keys": [...], ...}
+
+    `text` is chunked server side, `chunks` are stored as given. Optional
+    `vectors` (one per chunk) skip embedding. Bad lines are skipped; the
+    first MAX_BULK_ERRORS are stored with the job when it ends, all are
+    counted. Documents stream straight into the batcher, so the request
+    body is never held in memory.
+    """
+    from .jobs import get_job_manager, JobStatus
+    from .chunking import recursive_character_chunking
+    from ..storage.vector_db import build_payload, VECTOR_SIZE
+    job_manager = get_job_manager()
+
+    batcher = ChunkBatcher(on_flush=lambda embedded, upserted: job_manager.update_progress(
+        job_id, "upserted", increment=True,
+        chunks_embedded=sum(embedded.values()), points_upserted=sum(upserted.values())
+    ))
+    documents = 0
+    line_no = 0
+    errors = 0
+    line_errors: List[Dict[str, Any]] = []
+
+    timings: Dict[str, float] = {}
+    job_manager.update_job_status(job_id, JobStatus.PROCESSING)
+    JOBS_ACTIVE.inc()
+    try:
+        async for line in lines:
+            line_no += 1
+            if not line.strip():
+                continue
+            try:
+                doc = json.loads(line)
+                if not isinstance(doc, dict):
+                    raise ValueError("Line must be a JSON object")
+
+                keys = doc.get("keys", default_keys)
+                if not isinstance(keys, list) or not all(isinstance(k, str) for k in keys):
+                    raise ValueError("keys must be a list of strings")
+                metadata = doc.get("metadata") or {}
+                filename = doc.get("filename") or f"bulk-{job_id}-{line_no}"
+
+                if not isinstance(metadata, dict):
+                    raise ValueError("metadata must be an object")
+
+                if "chunks" in doc:
+                    chunks = doc["chunks"]
+                    if not isinstance(chunks, list) or not all(isinstance(c, str) for c in chunks):
+                        raise ValueError("chunks must be a list of strings")
+                elif "text" in doc:
+                    if not isinstance(doc["text"], str):
+                        raise ValueError("text must be a string")
+                    with timed("chunking", timings):
+                        chunks = recursive_character_chunking(doc["text"])
+                    INGEST_CHUNKS.inc(len(chunks))
+                else:
+                    raise ValueError("Line needs 'text' or 'chunks'")
+
+                vectors = doc.get("vectors")
+                if vectors is not None:
+                    if "chunks" not in doc or not isinstance(vectors, list) or len(vectors) != len(chunks):
+                        raise ValueError("'vectors' needs 'chunks' with one vector per chunk")
+                    for v in vectors:
+                        if not isinstance(v, list) or len(v) != VECTOR_SIZE:
+                            raise ValueError(f"Vectors must be lists of {VECTOR_SIZE} numbers")
+                        # bool is an int subclass but not a coordinate
+                        if not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in v):
+                            raise ValueError("Vectors must contain only numbers")
+            except (ValueError, TypeError) as e:
+                errors += 1
+                if len(line_errors) < MAX_BULK_ERRORS:
+                    line_errors.append({"file": None, "error": f"line {line_no}: {e}", "timestamp": datetime.now().isoformat()})
+                continue
+
+            for i, chunk in enumerate(chunks):
+                await batcher.add(
+                    chunk,
+                    build_payload(chunk, keys, filename, i, metadata),
+                    vector=vectors[i] if vectors is not None else None
+                )
+            documents += 1
+
+        await batcher.flush()
+
+        result = {
+            "status": "processed",
+            "document_count": documents,
+            "chunk_count": batcher.total_upserted,
+            "embedded_count": batcher.total_embedded,
+            "error_count": errors
+        }
+        final_status = JobStatus.COMPLETED if not errors else (JobStatus.PARTIAL if documents else JobStatus.FAILED)
+        timings.update(batcher.timings)
+        # Written once at the end: per-line add_error calls rewrite the whole job each time
+        job_manager.update_job_status(job_id, final_status, {"result": result, "timings": timings, "errors": line_errors})
+        return {"job_id": job_id, **result, "status": final_status.value}
+
+    except Exception as e:
+        logger.error(f"Bulk job {job_id} failed logic: {e}")
+        job_manager.update_job_status(job_id, JobStatus.FAILED, {"error": str(e), "errors": line_errors})
+        job_manager.add_error(job_id, str(e))
+        raise
+    finally:
+        JOBS_ACTIVE.dec()
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Split a streamed request body into lines.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline == -1:
+                break
+            yield bytes(buffer[start:newline])
+            start = newline + 1
+        del buffer[:start]
+    if buffer:
+        yield bytes(buffer)
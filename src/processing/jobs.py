@@ -1,11 +1,23 @@
 import uuid
+import os
+import json
+import sqlite3
+import threading
+import time
 from enum import Enum
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 from datetime import datetime
+from .events import get_event_bus
 
 logger = logging.getLogger("rog.jobs")
 
+JOB_DB_PATH = os.getenv("ROG_JOB_DB", "data/jobs.db")
+JOB_TTL_SECONDS = int(os.getenv("ROG_JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+JOB_MAX_ROWS = int(os.getenv("ROG_JOB_MAX_ROWS", "10000"))
+# Evict on every Nth create_job instead of on every insert
+EVICT_EVERY = 100
+
 class JobStatus(str, Enum):
     PENDING = "PENDING"
     PROCESSING = "PROCESSING"
@@ -13,45 +25,217 @@ class JobStatus(str, Enum):
     FAILED = "FAILED"
     PARTIAL = "PARTIAL"
 
+TERMINAL_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.PARTIAL)
+
 class JobManager:
-    def __init__(self):
-        # In-memory job store for MVP. For production, use Redis/DB.
-        self.jobs: Dict[str, Dict[str, Any]] = {}
+    """
+    Job store on local SQLite (WAL mode).
+    Status and timestamps are real columns (indexed), the rest of the
+    job record is kept as a compact JSON document. The database file is
+    shared by all uvicorn workers on the node and survives restarts.
+    """
+    def __init__(self, db_path: str = JOB_DB_PATH, ttl_seconds: int = JOB_TTL_SECONDS, max_rows: int = JOB_MAX_ROWS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._creates = 0
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # Background tasks and worker threads share one connection, guarded by _lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self._init_schema()
+        self.evict()
+
+    def _init_schema(self):
+        with self._lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, updated_at);
+                CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs(updated_at);
+            """)
+
+    def _read(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def _write(self, job: Dict[str, Any]):
+        now = time.time()
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE id = ?",
+            (job["status"], now, json.dumps(job, default=str), job["id"])
+        )
+
+    def _modify(self, job_id: str, fn) -> Optional[Dict[str, Any]]:
+        """
+        Read-modify-write a job record in a single write transaction, so
+        concurrent workers cannot lose each other's updates.
+        """
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._read(job_id)
+                if job is not None:
+                    fn(job)
+                    self._write(job)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return job
 
     def create_job(self) -> str:
         job_id = str(uuid.uuid4())
-        self.jobs[job_id] = {
+        job = {
             "id": job_id,
-            "status": JobStatus.PENDING,
+            "status": JobStatus.PENDING.value,
             "created_at": datetime.now().isoformat(),
             "files": [],
             "errors": []
         }
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, data) VALUES (?, ?, ?, ?, ?)",
+                (job_id, job["status"], now, now, json.dumps(job))
+            )
+            self._creates += 1
+            should_evict = self._creates % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
         return job_id
 
     def update_job_status(self, job_id: str, status: JobStatus, details: Dict[str, Any] = None):
-        if job_id in self.jobs:
-            self.jobs[job_id]["status"] = status
+        def apply(job):
+            job["status"] = JobStatus(status).value
             if details:
-                self.jobs[job_id].update(details)
-            self.jobs[job_id]["updated_at"] = datetime.now().isoformat()
+                job.update(details)
+            job["updated_at"] = datetime.now().isoformat()
+        job = self._modify(job_id, apply)
+        if job is not None:
+            get_event_bus().publish(job_id, "status", {
+                "status": job["status"],
+                "updated_at": job["updated_at"],
+                **(details or {})
+            })
+
+    def update_progress(self, job_id: str, stage: str = None, increment: bool = False, **counters: int):
+        """
+        Record pipeline progress (stage and counters such as pages_parsed,
+        chunks_embedded, points_upserted) and push it to event subscribers.
+        With increment=True the counters are added to the stored values.
+        """
+        def apply(job):
+            progress = job.setdefault("progress", {})
+            if stage:
+                progress["stage"] = stage
+            for name, value in counters.items():
+                progress[name] = progress.get(name, 0) + value if increment else value
+            job["updated_at"] = datetime.now().isoformat()
+        job = self._modify(job_id, apply)
+        if job is not None:
+            get_event_bus().publish(job_id, "progress", {
+                **job["progress"],
+                "updated_at": job["updated_at"]
+            })
 
     def add_error(self, job_id: str, error: str, file: str = None):
-        if job_id in self.jobs:
-             self.jobs[job_id]["errors"].append({
-                 "file": file,
-                 "error": error,
-                 "timestamp": datetime.now().isoformat()
-             })
+        def apply(job):
+            job["errors"].append({
+                "file": file,
+                "error": error,
+                "timestamp": datetime.now().isoformat()
+            })
+        if self._modify(job_id, apply) is not None:
+            # Not "error": EventSource reserves that name for connection failures
+            get_event_bus().publish(job_id, "job_error", {"file": file, "error": error})
 
     def get_job(self, job_id: str):
-        return self.jobs.get(job_id)
+        with self._lock:
+            return self._read(job_id)
+
+    def list_jobs(self, status: Optional[JobStatus] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Most recently updated jobs first, optionally restricted to one status.
+        """
+        with self._lock:
+            if status is not None:
+                rows = self.conn.execute(
+                    "SELECT data FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?",
+                    (JobStatus(status).value, limit)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT data FROM jobs ORDER BY updated_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        return [json.loads(r["data"]) for r in rows]
+
+    def count_jobs(self, status: Optional[JobStatus] = None) -> int:
+        with self._lock:
+            if status is not None:
+                row = self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (JobStatus(status).value,)).fetchone()
+            else:
+                row = self.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()
+        return row[0]
+
+    def evict(self) -> int:
+        """
+        Drop finished jobs older than the TTL, then the oldest finished ones
+        beyond max_rows. Pending and running jobs are never evicted.
+        Returns the number of removed jobs.
+        """
+        terminal = tuple(status.value for status in TERMINAL_STATUSES)
+        in_terminal = f"status IN ({', '.join('?' * len(terminal))})"
+        removed = 0
+        with self._lock:
+            if self.ttl_seconds > 0:
+                cur = self.conn.execute(
+                    f"DELETE FROM jobs WHERE {in_terminal} AND updated_at < ?",
+                    (*terminal, time.time() - self.ttl_seconds)
+                )
+                removed += cur.rowcount
+            if self.max_rows > 0:
+                cur = self.conn.execute(
+                    "DELETE FROM jobs WHERE id IN ("
+                    f" SELECT id FROM jobs WHERE {in_terminal} ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                    (*terminal, self.max_rows)
+                )
+                removed += cur.rowcount
+        if removed:
+            logger.info(f"Evicted {removed} jobs from job store")
+        return removed
+
+    def compact(self) -> int:
+        """
+        Reclaim space freed by evicted jobs. Returns the database size in bytes.
+        """
+        with self._lock:
+            self.conn.execute("VACUUM")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return os.path.getsize(self.db_path)
 
 # Singleton
 _job_manager = None
+# Request handlers and worker threads may open the store at once
+_job_manager_lock = threading.Lock()
 
 def get_job_manager():
     global _job_manager
     if _job_manager is None:
-        _job_manager = JobManager()
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager()
     return _job_manager
@@ -13,6 +13,8 @@ def load_archive(file_path: str, max_files: int = 50) -> dict:
     """
     processed_count = 0
     combined_text = []
+    spans = []
+    position = 0
     
     try:
         if not zipfile.is_zipfile(file_path):
@@ -82,7 +84,14 @@ def load_archive(file_path: str, max_files: int = 50) -> dict:
                         
                     if file_text.strip():
                         combined_text.append(f"--- FILE: {file} ---")
+                        position += len(combined_text[-1]) + 1
                         combined_text.append(file_text)
+                        # Member locations, shifted to the combined text
+                        member = os.path.relpath(full_path, extract_folder)
+                        spans.append({"start": position, "end": position + len(file_text), "source_file": member})
+                        for span in res.get("spans") or []:
+                            spans.append({**span, "start": span["start"] + position, "end": span["end"] + position})
+                        position += len(file_text) + 1
                         processed_count += 1
                         
                 except Exception as e:
@@ -101,6 +110,7 @@ def load_archive(file_path: str, max_files: int = 50) -> dict:
         return {
             "status": "success",
             "text": "\n".join(combined_text),
+            "spans": spans,
             "metadata": {
                 "type": "zip_archive",
                 "processed_files_count": processed_count,
@@ -1,6 +1,7 @@
 from PIL import Image
 import pytesseract
 import logging
+from ...metrics import timed
 
 logger = logging.getLogger("rog.loader.image")
 
@@ -13,7 +14,8 @@ def load_image(file_path: str) -> dict:
         
         # Try OCR
         try:
-            text = pytesseract.image_to_string(image)
+            with timed("ocr"):
+                text = pytesseract.image_to_string(image)
         except Exception as e:
             logger.warning(f"OCR failed for {file_path}. Tesseract might not be installed. Error: {e}")
             text = ""
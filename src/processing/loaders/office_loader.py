@@ -57,19 +57,25 @@ def load_xlsx(file_path: str) -> Dict[str, Any]:
     try:
         wb = openpyxl.load_workbook(file_path, data_only=True)
         full_text = []
+        spans = []
+        position = 0
         
         for sheet in wb.sheetnames:
             ws = wb[sheet]
             full_text.append(f"--- Sheet: {sheet} ---")
-            for row in ws.iter_rows(values_only=True):
+            position += len(full_text[-1]) + 1
+            for row_num, row in enumerate(ws.iter_rows(values_only=True), start=ws.min_row):
                 # Filter None values and convert to string
                 row_text = [str(cell) for cell in row if cell is not None]
                 if row_text:
                     full_text.append(" | ".join(row_text))
+                    spans.append({"start": position, "end": position + len(full_text[-1]), "sheet": sheet, "row": row_num})
+                    position += len(full_text[-1]) + 1
                     
         return {
             "status": "success",
             "text": "\n".join(full_text),
+            "spans": spans,
             "metadata": {"type": "xlsx", "sheets": wb.sheetnames}
         }
     except Exception as e:
@@ -84,6 +90,8 @@ def load_pptx(file_path: str) -> Dict[str, Any]:
     try:
         prs = Presentation(file_path)
         full_text = []
+        spans = []
+        position = 0
         
         for i, slide in enumerate(prs.slides):
             slide_text = []
@@ -92,12 +100,16 @@ def load_pptx(file_path: str) -> Dict[str, Any]:
                     slide_text.append(shape.text)
             
             if slide_text:
+                block = "\n".join([f"--- Slide {i+1} ---"] + slide_text)
                 full_text.append(f"--- Slide {i+1} ---")
                 full_text.extend(slide_text)
+                spans.append({"start": position, "end": position + len(block), "slide": i + 1})
+                position += len(block) + 1
                 
         return {
             "status": "success",
             "text": "\n".join(full_text),
+            "spans": spans,
             "metadata": {"type": "pptx", "slides": len(prs.slides)}
         }
     except Exception as e:
@@ -6,12 +6,14 @@ logger = logging.getLogger("rog.loader.pdf")
 def load_pdf(file_path: str) -> dict:
     """
     Extracts text from a PDF file.
-    Returns a dictionary with text content and metadata (page numbers).
+    Returns a dictionary with text content and metadata (page numbers,
+    and the character span of each page in the text).
     """
     try:
         doc = fitz.open(file_path)
         full_text = ""
         pages_content = []
+        spans = []
         
         for page_num, page in enumerate(doc):
             text = page.get_text()
@@ -19,6 +21,7 @@ def load_pdf(file_path: str) -> dict:
             text = text.strip()
             
             if text:
+                spans.append({"start": len(full_text), "end": len(full_text) + len(text), "page": page_num + 1})
                 full_text += text + "\n\n"
                 pages_content.append({
                     "page": page_num + 1,
@@ -34,6 +37,7 @@ def load_pdf(file_path: str) -> dict:
             "status": "success",
             "text": full_text,
             "pages": pages_content,
+            "spans": spans,
             "needs_ocr": len(full_text.strip()) == 0
         }
         
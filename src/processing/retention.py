@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from qdrant_client.http import models
+from .ingest import UPLOAD_DIR
+from .jobs import get_job_manager
+from ..storage.vector_db import get_vector_db, ingested_before_filter
+
+logger = logging.getLogger("rog.retention")
+
+# Documents older than this are deleted by the retention pass (0 disables it)
+RETENTION_DAYS = float(os.getenv("ROG_RETENTION_DAYS", "0"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("ROG_RETENTION_INTERVAL_SECONDS", "3600"))
+
+def _is_upload(path: str) -> bool:
+    upload_dir = os.path.abspath(UPLOAD_DIR)
+    return os.path.commonpath([upload_dir, os.path.abspath(path)]) == upload_dir
+
+def remove_orphaned_uploads(paths: Iterable[str]) -> List[str]:
+    """
+    Delete stored uploads no point refers to any more.
+    Only files inside UPLOAD_DIR are touched. Returns the removed paths.
+    """
+    vector_db = get_vector_db()
+    removed = []
+    for path in sorted(set(paths)):
+        if not _is_upload(path) or not os.path.isfile(path):
+            continue
+        still_used = models.Filter(must=[
+            models.FieldCondition(key="original_file", match=models.MatchValue(value=path))
+        ])
+        if vector_db.count(still_used):
+            continue
+        try:
+            os.remove(path)
+            removed.append(path)
+        except OSError as e:
+            logger.warning(f"Could not remove upload {path}: {e}")
+            continue
+        # Batch uploads live in a folder per job
+        folder = os.path.dirname(path)
+        if folder != os.path.abspath(UPLOAD_DIR):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                pass
+    if removed:
+        logger.info(f"Removed {len(removed)} stored uploads")
+    return removed
+
+def delete_documents(query_filter: models.Filter, extra_files: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Delete the matching points and the stored uploads they came from.
+    `extra_files` are upload paths to remove as well if unreferenced
+    (e.g. an upload that never produced points). Blocking.
+    """
+    vector_db = get_vector_db()
+    files = vector_db.source_files(query_filter)
+    points_deleted = vector_db.delete_points(query_filter)
+    files_removed = remove_orphaned_uploads(files | set(extra_files))
+    return {"points_deleted": points_deleted, "files_removed": files_removed}
+
+def sweep_uploads(cutoff: float) -> List[str]:
+    """
+    Remove uploads older than the cutoff (mtime, epoch seconds) that are not
+    referenced by any point, e.g. unsupported types or failed jobs.
+    """
+    if not os.path.isdir(UPLOAD_DIR):
+        return []
+    candidates = []
+    for root, _, names in os.walk(UPLOAD_DIR):
+        for name in names:
+            path = os.path.abspath(os.path.join(root, name))
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    candidates.append(path)
+            except OSError:
+                continue
+    return remove_orphaned_uploads(candidates)
+
+def compact_storage() -> Dict[str, Any]:
+    """
+    Compact the vector store and the job store. Blocking.
+    """
+    vector_store = get_vector_db().compact()
+    job_store_bytes = get_job_manager().compact()
+    return {"vector_store": vector_store, "job_store_bytes": job_store_bytes}
+
+def apply_retention(days: Optional[float] = None) -> Dict[str, Any]:
+    """
+    One retention pass: delete documents ingested more than `days` ago,
+    sweep stale uploads and evict old jobs. Each store is compacted only
+    if something was removed from it. Blocking; run it in a worker thread.
+    """
+    days = RETENTION_DAYS if days is None else days
+    if days <= 0:
+        return {"enabled": False}
+    started = time.perf_counter()
+    cutoff = time.time() - days * 24 * 3600
+    result = delete_documents(ingested_before_filter(cutoff))
+    result["files_removed"] += sweep_uploads(cutoff)
+    job_manager = get_job_manager()
+    result["jobs_evicted"] = job_manager.evict()
+    compaction = {}
+    # Reloading the vector store blocks searches, so only do it when points went away
+    if result["points_deleted"]:
+        compaction["vector_store"] = get_vector_db().compact()
+    if result["jobs_evicted"]:
+        compaction["job_store_bytes"] = job_manager.compact()
+    if compaction:
+        result["compaction"] = compaction
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Retention pass ({days} days): {result['points_deleted']} points, "
+                f"{len(result['files_removed'])} uploads removed")
+    return {"enabled": True, "cutoff": cutoff, **result}
+
+async def retention_loop(interval: float = RETENTION_INTERVAL_SECONDS):
+    """
+    Run the retention pass periodically (started from the app lifespan).
+    """
+    while True:
+        try:
+            await asyncio.to_thread(apply_retention)
+        except Exception as e:
+            logger.error(f"Retention pass failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,193 @@
+"""
+On-demand profiling for live diagnostics.
+
+- cProfile of the event loop thread for N seconds (pstats or text report)
+- wall-clock stack sampling of all threads for N seconds (collapsed stacks,
+  ready for flamegraph.pl / speedscope)
+- call-tree tracing of a single operation, including the worker threads it
+  hands embedding and upserts to
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+MAX_PROFILE_SECONDS = float(os.getenv("ROG_PROFILE_MAX_SECONDS", "120"))
+SAMPLE_INTERVAL_SECONDS = 0.005
+
+# Only one profiler at a time: they share the interpreter's profile hooks
+profile_lock = asyncio.Lock()
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+async def cprofile_event_loop(seconds: float) -> cProfile.Profile:
+    """
+    Profile everything that runs on the event loop thread (handlers,
+    background tasks, coroutines) for `seconds`.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    return profiler
+
+
+def pstats_bytes(profiler: cProfile.Profile) -> bytes:
+    """
+    Binary pstats dump, loadable with pstats.Stats(path) or snakeviz.
+    """
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def pstats_text(profiler: cProfile.Profile, limit: int = 60) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def sample_stacks(seconds: float, interval: float = SAMPLE_INTERVAL_SECONDS) -> Counter:
+    """
+    Sample the stacks of all threads. Blocking; run it in a worker thread.
+    Returns {"thread;outer;...;inner": samples}.
+    """
+    me = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    names: Dict[int, str] = {}
+    while time.monotonic() < deadline:
+        if len(names) != threading.active_count():
+            names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed_text(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class CallTreeTracer:
+    """
+    Builds a call tree (calls and inclusive wall time per path) with a
+    profile hook. Installed per thread: on the thread running the traced
+    operation and, via the executor initializer, on its worker threads.
+    """
+    def __init__(self, max_depth: int = 60):
+        self.max_depth = max_depth
+        self.roots: Dict[str, Dict[str, Any]] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _node(name: str) -> Dict[str, Any]:
+        return {"name": name, "calls": 0, "total": 0.0, "children": {}}
+
+    def install(self):
+        thread = threading.current_thread().name
+        with self._lock:
+            root = self.roots.setdefault(thread, self._node(thread))
+        self._local.stack = [(root, time.perf_counter())]
+        sys.setprofile(self._profile)
+
+    def uninstall(self):
+        sys.setprofile(None)
+        stack = getattr(self._local, "stack", None)
+        if stack:
+            root, started = stack[0]
+            root["total"] += time.perf_counter() - started
+            root["calls"] += 1
+        self._local.stack = None
+
+    def _profile(self, frame, event, arg):
+        stack = self._local.stack
+        if stack is None:
+            return
+        if event == "call" or event == "c_call":
+            if len(stack) > self.max_depth:
+                stack.append((None, 0.0))
+                return
+            parent = stack[-1][0]
+            if parent is None:
+                stack.append((None, 0.0))
+                return
+            if event == "call":
+                name = _frame_label(frame.f_code)
+            else:
+                name = f"{getattr(arg, '__qualname__', repr(arg))} (builtin)"
+            node = parent["children"].get(name)
+            if node is None:
+                node = parent["children"][name] = self._node(name)
+            node["calls"] += 1
+            stack.append((node, time.perf_counter()))
+        elif event in ("return", "c_return", "c_exception"):
+            if len(stack) > 1:
+                node, started = stack.pop()
+                if node is not None:
+                    node["total"] += time.perf_counter() - started
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """
+        Call fn in the current thread with tracing enabled.
+        """
+        self.install()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.uninstall()
+
+    def run_coroutine(self, coro_factory: Callable):
+        """
+        Run a coroutine on a private event loop in the current thread. The
+        loop's default executor traces its threads too, so work sent to
+        asyncio.to_thread (embedding, upserts) shows up in the tree.
+        """
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(thread_name_prefix="rog-trace", initializer=self.install)
+        loop.set_default_executor(executor)
+        self.install()
+        try:
+            return loop.run_until_complete(coro_factory())
+        finally:
+            self.uninstall()
+            executor.shutdown(wait=True)
+            loop.close()
+
+    def tree(self, min_ms: float = 0.5) -> List[Dict[str, Any]]:
+        def convert(node):
+            children = sorted(node["children"].values(), key=lambda n: n["total"], reverse=True)
+            return {
+                "name": node["name"],
+                "calls": node["calls"],
+                "total_ms": round(node["total"] * 1000, 3),
+                "children": [convert(c) for c in children if c["total"] * 1000 >= min_ms],
+            }
+        trees = []
+        for root in self.roots.values():
+            tree = convert(root)
+            # Executor threads are never uninstalled, their root time is the sum of their calls
+            if not root["total"]:
+                tree["total_ms"] = round(sum(c["total"] for c in root["children"].values()) * 1000, 3)
+            trees.append(tree)
+        return trees
@@ -0,0 +1,163 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import logging
+from .models import SearchQuery, SearchResponse, SearchResultChunk
+from .storage.embeddings import get_embedding_service
+from .storage.vector_db import get_vector_db
+
+logger = logging.getLogger("rog.search")
+
+# Hits fetched from the vector store per page of a streamed search
+STREAM_PAGE_SIZE = int(os.getenv("ROG_SEARCH_STREAM_PAGE_SIZE", "500"))
+MAX_STREAM_RESULTS = int(os.getenv("ROG_MAX_STREAM_RESULTS", "100000"))
+# Scores closer than this count as equal when matching the previous page's last hit
+SCORE_EPSILON = 1e-6
+
+class InvalidCursor(ValueError):
+    pass
+
+def _fingerprint(query: SearchQuery) -> str:
+    """
+    Ties a cursor to the query it was issued for.
+    """
+    key = json.dumps([query.query, sorted(query.filter_keys or []), sorted(query.exclude_keys or []),
+                      query.scope()], sort_keys=True)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+# Last hit of the previous page: (score, point id)
+LastHit = Optional[Tuple[float, Any]]
+
+def encode_cursor(query: SearchQuery, offset: int, score: float, point_id: Any) -> str:
+    raw = json.dumps({"o": offset, "s": score, "i": point_id, "q": _fingerprint(query)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(query: SearchQuery, cursor: Optional[str]) -> Tuple[int, LastHit]:
+    """
+    (offset, last hit) of a cursor, (0, None) when there is none.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        offset, score, point_id = int(data["o"]), float(data["s"]), data["i"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if data.get("q") != _fingerprint(query) or offset < 0:
+        raise InvalidCursor("Cursor does not belong to this query")
+    return offset, (score, point_id)
+
+def _skip_repeats(hits: list, last: LastHit) -> list:
+    """
+    Drop hits the previous page already returned. Documents ingested since
+    then shift the ranking down, so the page starts with the previous last
+    hit (same score and id) and possibly hits that were above it.
+    """
+    if last is None:
+        return hits
+    last_score, last_id = last
+    # Hits are best first: the ones at or above the last score form a prefix
+    head = 0
+    while head < len(hits) and hits[head].score >= last_score - SCORE_EPSILON:
+        head += 1
+    for i in range(head):
+        if str(hits[i].id) == str(last_id):
+            return hits[i + 1:]
+    # Last hit not found (deleted or equal scores reordered): drop only the hits strictly above it
+    return [hit for hit in hits if hit.score <= last_score + SCORE_EPSILON]
+
+def _range(label: str, start, end) -> str:
+    return f"{label} {start}" if start == end else f"{label} {start}-{end}"
+
+def format_citation(payload: Dict[str, Any]) -> str:
+    """
+    Compact location of a chunk: "data.zip > q3.xlsx, sheet Sales, rows 4-18".
+    """
+    parts = [payload.get("filename") or ""]
+    if payload.get("source_files"):
+        parts[0] += " > " + ", ".join(payload["source_files"])
+    if payload.get("page_start") is not None:
+        parts.append(_range("p.", payload["page_start"], payload["page_end"]))
+    if payload.get("slide_start") is not None:
+        parts.append(_range("slide" if payload["slide_start"] == payload["slide_end"] else "slides",
+                            payload["slide_start"], payload["slide_end"]))
+    if payload.get("sheets"):
+        parts.append(("sheet " if len(payload["sheets"]) == 1 else "sheets ") + ", ".join(payload["sheets"]))
+    if payload.get("row_start") is not None:
+        parts.append(_range("row" if payload["row_start"] == payload["row_end"] else "rows",
+                            payload["row_start"], payload["row_end"]))
+    return ", ".join(p for p in parts if p)
+
+def search_page(query: SearchQuery, query_vector: list, offset: int, last: LastHit,
+                limit: int) -> Tuple[List[SearchResultChunk], Optional[str]]:
+    """
+    One page of hits starting at `offset`, plus the cursor of the next page
+    (None on the last page). `last` is the previous page's last hit; repeats
+    of earlier pages are left out, so a page can hold fewer than `limit`
+    hits. Blocking.
+    """
+    # One extra hit tells whether another page exists
+    hits = get_vector_db().search(
+        query_vector=query_vector,
+        filter_keys=query.filter_keys,
+        exclude_keys=query.exclude_keys,
+        top_k=limit + 1,
+        offset=offset,
+        scope=query.scope()
+    )
+    has_more = len(hits) > limit
+    hits = hits[:limit]
+
+    results = [
+        SearchResultChunk(
+            text=hit.payload.get("text", ""), score=hit.score, metadata=hit.payload,
+            citation=format_citation(hit.payload)
+        )
+        for hit in _skip_repeats(hits, last)
+    ]
+    next_cursor = None
+    if has_more and hits:
+        next_cursor = encode_cursor(query, offset + len(hits), hits[-1].score, hits[-1].id)
+    return results, next_cursor
+
+def run_search(query: SearchQuery) -> SearchResponse:
+    """
+    Embed the query and fetch one page of results. Blocking.
+    """
+    offset, last = decode_cursor(query, query.cursor)
+    query_vector = get_embedding_service().embed_text(query.query)
+    results, next_cursor = search_page(query, query_vector, offset, last, query.top_k)
+    return SearchResponse(results=results, next_cursor=next_cursor)
+
+async def stream_search(query: SearchQuery, limit: int) -> AsyncIterator[str]:
+    """
+    NDJSON lines: one per hit, fetched page by page so memory stays
+    constant, then a trailer {"done": true, "count", "next_cursor"}.
+    A failure mid-stream ends it with {"error": ...} instead.
+    """
+    count = 0
+    next_cursor = None
+    try:
+        offset, last = decode_cursor(query, query.cursor)
+        query_vector = await asyncio.to_thread(get_embedding_service().embed_text, query.query)
+        while count < limit:
+            page_size = min(STREAM_PAGE_SIZE, limit - count)
+            results, next_cursor = await asyncio.to_thread(
+                search_page, query, query_vector, offset, last, page_size
+            )
+            lines = "".join(result.model_dump_json() + "\n" for result in results)
+            count += len(results)
+            if lines:
+                yield lines
+            if next_cursor is None:
+                break
+            offset, last = decode_cursor(query, next_cursor)
+    except Exception as e:
+        logger.error(f"Streamed search failed after {count} results: {e}")
+        yield json.dumps({"error": str(e), "count": count}) + "\n"
+        return
+    yield json.dumps({"done": True, "count": count, "next_cursor": next_cursor}) + "\n"
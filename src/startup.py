@@ -0,0 +1,79 @@
+import os
+import time
+import logging
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger("rog.startup")
+
+# Reference point for startup timing: the first import of the app package
+PROCESS_STARTED = time.perf_counter()
+
+WARMUP_ENABLED = os.getenv("ROG_WARMUP", "1") != "0"
+
+class WarmupState:
+    """
+    Tracks background warm-up so /readyz can report it.
+    """
+    def __init__(self):
+        self.status = "starting"
+        self.error: Optional[str] = None
+        self.import_seconds: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "error": self.error,
+            "import_seconds": self.import_seconds,
+            "startup_seconds": self.startup_seconds,
+            "warmup_seconds": self.steps,
+        }
+
+    def mark_ready(self):
+        self.status = "ready"
+        self.startup_seconds = round(time.perf_counter() - PROCESS_STARTED, 3)
+        logger.info(f"Ready after {self.startup_seconds}s (imports {self.import_seconds}s, warm-up {self.steps})")
+
+def _step(state: WarmupState, name: str, fn):
+    started = time.perf_counter()
+    result = fn()
+    state.steps[name] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_warmup(state: WarmupState):
+    """
+    Load everything the first request would otherwise pay for: the job
+    store, the embedding model (plus one dummy encode) and the vector store.
+    Blocking; run it in a worker thread.
+    """
+    from .processing.jobs import get_job_manager
+    from .storage.embeddings import get_embedding_service
+    from .storage.vector_db import get_vector_db
+
+    state.status = "warming"
+    try:
+        _step(state, "job_store", get_job_manager)
+        embed_service = _step(state, "embedding_model", get_embedding_service)
+        _step(state, "embedding_encode", lambda: embed_service.embed_text("warmup"))
+        vector_db = _step(state, "vector_store", get_vector_db)
+        _step(state, "vector_store_preload", vector_db.preload)
+    except Exception as e:
+        state.status = "failed"
+        state.error = str(e)
+        logger.error(f"Warm-up failed: {e}")
+        return
+    state.mark_ready()
+
+# Singleton
+_warmup_state = None
+
+def get_warmup_state():
+    global _warmup_state
+    if _warmup_state is None:
+        _warmup_state = WarmupState()
+    return _warmup_state
@@ -0,0 +1,258 @@
+"""
+Shared embedding server.
+
+One process owns the SentenceTransformer model and serves all uvicorn
+workers of the node over a Unix socket, so the model is loaded once no
+matter how many HTTP workers run. Requests from all connections are
+coalesced into one encode call per batch window.
+
+Start it next to the API and point the workers at the socket:
+
+    python -m src.storage.embedding_server --socket /tmp/rog-embed.sock
+    ROG_EMBED_SOCKET=/tmp/rog-embed.sock uvicorn src.main:app --workers 4
+
+Wire format (both directions): a 4-byte big-endian length followed by a
+JSON header. Request headers are {"op": "encode", "texts": [...]} or
+{"op": "info"}. An encode response header {"n": .., "dim": .., "dtype":
+"float32"} is followed by the raw n * dim float32 matrix (row-major).
+Errors are returned as {"error": "..."} with no body.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import numpy as np
+from ..metrics import timed, EMBED_BATCH_SIZE
+
+logger = logging.getLogger("rog.storage.embedding_server")
+
+HEADER = struct.Struct(">I")
+# Texts encoded per model call, across all connected workers
+MAX_BATCH = int(os.getenv("ROG_EMBED_SERVER_MAX_BATCH", "256"))
+# How long the first request of a batch waits for others to join
+BATCH_WINDOW_SECONDS = float(os.getenv("ROG_EMBED_SERVER_WINDOW_MS", "5")) / 1000
+CONNECT_TIMEOUT_SECONDS = 30
+
+
+def _pack(header: dict) -> bytes:
+    data = json.dumps(header).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+class EmbeddingServer:
+    def __init__(self, socket_path: str, model_name: str = None):
+        from .embeddings import EmbeddingService, EMBED_MODEL
+        self.socket_path = socket_path
+        self.service = EmbeddingService(model_name or EMBED_MODEL)
+        self.dim = self.service.embed_array(["warmup"]).shape[1]
+        self._queue: asyncio.Queue = None
+        # The model gets one thread; torch parallelises each encode internally
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+
+    async def serve(self):
+        self._queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        batcher = asyncio.create_task(self._batch_loop())
+        logger.info(f"Embedding server listening on {self.socket_path} (dim={self.dim})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    (length,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                    payload = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    request = json.loads(payload)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    writer.write(_pack({"error": "Request must be a JSON object"}))
+                    await writer.drain()
+                    continue
+
+                op = request.get("op", "encode")
+                texts = request.get("texts") or []
+                if op == "info":
+                    writer.write(_pack({"dim": self.dim, "model": self.service.model_name}))
+                elif op == "encode" and (not isinstance(texts, list) or not all(isinstance(t, str) for t in texts)):
+                    # Rejected here so a bad request never fails a shared batch
+                    writer.write(_pack({"error": "texts must be a list of strings"}))
+                elif op == "encode":
+                    future = asyncio.get_running_loop().create_future()
+                    await self._queue.put((texts, future))
+                    try:
+                        vectors = await future
+                    except Exception as e:
+                        writer.write(_pack({"error": str(e)}))
+                    else:
+                        writer.write(_pack({"n": vectors.shape[0], "dim": self.dim, "dtype": "float32"}))
+                        if vectors.size:
+                            writer.write(memoryview(vectors).cast("B"))
+                else:
+                    writer.write(_pack({"error": f"Unknown op: {op}"}))
+                await writer.drain()
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vectors = await asyncio.get_running_loop().run_in_executor(self._executor, self.service.embed_array, texts)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending: List[Tuple[list, asyncio.Future]] = [await self._queue.get()]
+            total = len(pending[0][0])
+            deadline = loop.time() + BATCH_WINDOW_SECONDS
+            while total < MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                total += len(item[0])
+
+            texts = [t for request_texts, _ in pending for t in request_texts]
+            try:
+                vectors = await self._encode(texts)
+            except Exception as e:
+                logger.error(f"Encoding batch of {len(texts)} from {len(pending)} requests failed: {e}")
+                if len(pending) == 1:
+                    if not pending[0][1].done():
+                        pending[0][1].set_exception(e)
+                    continue
+                # Retry request by request, so only the one that breaks the model gets the error
+                for request_texts, future in pending:
+                    try:
+                        request_vectors = await self._encode(request_texts)
+                    except Exception as request_error:
+                        if not future.done():
+                            future.set_exception(request_error)
+                    else:
+                        if not future.done():
+                            future.set_result(request_vectors)
+                continue
+
+            # Row slices of a C-contiguous matrix are views, nothing is copied
+            offset = 0
+            for request_texts, future in pending:
+                if not future.done():
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+
+class RemoteEmbeddingService:
+    """
+    Drop-in replacement for EmbeddingService that forwards to the shared
+    embedding server. One connection per calling thread.
+    """
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._local = threading.local()
+        info = self._request({"op": "info"})
+        self.model_name = info.get("model")
+        self.dim = info["dim"]
+        logger.info(f"Using embedding server at {socket_path} ({self.model_name}, dim={self.dim})")
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + CONNECT_TIMEOUT_SECONDS
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                # Server may still be loading the model
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _recv_into(self, sock: socket.socket, buffer) -> None:
+        view = memoryview(buffer)
+        while view:
+            received = sock.recv_into(view)
+            if not received:
+                raise ConnectionError("Embedding server closed the connection")
+            view = view[received:]
+
+    def _exchange(self, sock: socket.socket, request: dict):
+        sock.sendall(_pack(request))
+        length_bytes = bytearray(HEADER.size)
+        self._recv_into(sock, length_bytes)
+        (length,) = HEADER.unpack(length_bytes)
+        header_bytes = bytearray(length)
+        self._recv_into(sock, header_bytes)
+        header = json.loads(header_bytes)
+        if "error" in header:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        if "n" not in header:
+            return header
+        body = bytearray(header["n"] * header["dim"] * 4)
+        self._recv_into(sock, body)
+        # frombuffer wraps the receive buffer without copying
+        return np.frombuffer(body, dtype=np.float32).reshape(header["n"], header["dim"])
+
+    def _request(self, request: dict):
+        sock = getattr(self._local, "sock", None)
+        for attempt in range(2):
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                return self._exchange(sock, request)
+            except (ConnectionError, OSError):
+                sock.close()
+                sock = self._local.sock = None
+                if attempt:
+                    raise
+
+    def embed_array(self, texts: list, kind: str = "batch") -> np.ndarray:
+        EMBED_BATCH_SIZE.observe(len(texts), kind=kind)
+        with timed(f"embed_{kind}"):
+            return self._request({"op": "encode", "texts": list(texts)})
+
+    def embed_text(self, text: str):
+        return self.embed_array([text], kind="text")[0].tolist()
+
+    def embed_batch(self, texts: list):
+        return self.embed_array(texts).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding model server")
+    parser.add_argument("--socket", default=os.getenv("ROG_EMBED_SOCKET", "/tmp/rog-embed.sock"))
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = EmbeddingServer(args.socket, args.model)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
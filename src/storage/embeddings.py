@@ -1,24 +1,54 @@
-from sentence_transformers import SentenceTransformer
 import logging
+import os
+import threading
+import numpy as np
+from ..metrics import timed, EMBED_BATCH_SIZE
 
 logger = logging.getLogger("rog.storage.embedding")
 
+EMBED_MODEL = os.getenv("ROG_EMBED_MODEL", "all-MiniLM-L6-v2")
+# When set, embeddings come from the shared embedding server on this Unix socket
+EMBED_SOCKET = os.getenv("ROG_EMBED_SOCKET")
+
 class EmbeddingService:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = EMBED_MODEL):
+        # Imported here so workers using the embedding server never load torch
+        from sentence_transformers import SentenceTransformer
         logger.info(f"Loading embedding model: {model_name}")
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
-        
+
     def embed_text(self, text: str):
-        return self.model.encode(text).tolist()
+        EMBED_BATCH_SIZE.observe(1, kind="text")
+        with timed("embed_text"):
+            return self.model.encode(text).tolist()
 
     def embed_batch(self, texts: list):
-        return self.model.encode(texts).tolist()
+        EMBED_BATCH_SIZE.observe(len(texts), kind="batch")
+        with timed("embed_batch"):
+            return self.model.encode(texts).tolist()
+
+    def embed_array(self, texts: list) -> np.ndarray:
+        """
+        Embeddings as a (len(texts), dim) float32 array.
+        """
+        EMBED_BATCH_SIZE.observe(len(texts), kind="batch")
+        with timed("embed_batch"):
+            return np.asarray(self.model.encode(texts), dtype=np.float32)
 
 # Singleton instance
 _embedding_service = None
+# Warm-up and the first search or ingest may load the model from different threads at once
+_embedding_service_lock = threading.Lock()
 
 def get_embedding_service():
     global _embedding_service
     if _embedding_service is None:
-        _embedding_service = EmbeddingService()
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                if EMBED_SOCKET:
+                    from .embedding_server import RemoteEmbeddingService
+                    _embedding_service = RemoteEmbeddingService(EMBED_SOCKET)
+                else:
+                    _embedding_service = EmbeddingService()
     return _embedding_service
@@ -0,0 +1,243 @@
+"""
+Read-only search replicas.
+
+Qdrant local mode locks its storage folder, so only one process can open
+the index. With ROG_ROLE=writer a single process owns the Qdrant store
+(ingestion, deletes) and publishes its contents as snapshot generations:
+
+    data/generations/<generation>/   snapshot directory (see snapshot.py)
+    data/generations/CURRENT         name of the generation to serve
+
+CURRENT is replaced atomically, so readers never see a partial generation.
+With ROG_ROLE=reader every worker memory-maps the CURRENT generation (the
+page cache is shared between processes) and searches it with numpy,
+switching to a new generation when CURRENT changes.
+"""
+import asyncio
+import os
+import shutil
+import threading
+import time
+import logging
+from typing import Any, Dict, List, Optional
+import numpy as np
+from qdrant_client.http import models
+from ..metrics import timed, REGISTRY, SEARCH_RESULTS
+from .snapshot import Snapshot, export_snapshot, LOCATION_COLUMNS
+from .vector_db import LOCATION_RANGES, LOCATION_LISTS
+
+logger = logging.getLogger("rog.storage.replica")
+
+GENERATIONS_DIR = os.getenv("ROG_GENERATIONS_DIR", "data/generations")
+CURRENT_FILE = "CURRENT"
+# Old generations are kept a while for readers that have not switched yet
+KEEP_GENERATIONS = int(os.getenv("ROG_KEEP_GENERATIONS", "3"))
+PUBLISH_INTERVAL_SECONDS = float(os.getenv("ROG_PUBLISH_INTERVAL_SECONDS", "30"))
+REPLICA_POLL_SECONDS = float(os.getenv("ROG_REPLICA_POLL_SECONDS", "2"))
+
+INDEX_GENERATION = REGISTRY.gauge(
+    "rog_index_generation", "Index generation published (writer) or served (reader), as epoch milliseconds")
+
+# Store version contained in the last published generation
+_published_version: Optional[int] = None
+
+
+def current_generation(generations_dir: str = GENERATIONS_DIR) -> Optional[str]:
+    try:
+        with open(os.path.join(generations_dir, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune_generations(generations_dir: str, keep: int):
+    current = current_generation(generations_dir)
+    generations = sorted(
+        name for name in os.listdir(generations_dir)
+        if name != CURRENT_FILE and os.path.isdir(os.path.join(generations_dir, name)) and name.isdigit()
+    )
+    # Readers that still map a removed generation keep working: unlinked files stay mapped
+    for name in generations[:-keep] if keep > 0 else []:
+        if name != current:
+            shutil.rmtree(os.path.join(generations_dir, name), ignore_errors=True)
+
+
+def publish_generation(generations_dir: str = GENERATIONS_DIR, keep: int = KEEP_GENERATIONS) -> Dict[str, Any]:
+    """
+    Export the Qdrant store as a new generation and make it CURRENT.
+    Blocking; waits for a running snapshot import (the export takes the
+    store's maintenance lock).
+    """
+    global _published_version
+    from .vector_db import get_vector_db
+    os.makedirs(generations_dir, exist_ok=True)
+    generation = f"{int(time.time() * 1000):013d}"
+    vector_db = get_vector_db()
+    # Read before exporting: a write during the export triggers another publish
+    version = vector_db.version
+    manifest = export_snapshot(os.path.join(generations_dir, generation))
+
+    tmp_current = os.path.join(generations_dir, f".{CURRENT_FILE}.tmp-{os.getpid()}")
+    with open(tmp_current, "w", encoding="utf-8") as f:
+        f.write(generation)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_current, os.path.join(generations_dir, CURRENT_FILE))
+    _published_version = version
+    INDEX_GENERATION.set(int(generation))
+    logger.info(f"Published generation {generation} ({manifest['count']} points)")
+
+    _prune_generations(generations_dir, keep)
+    return {"generation": generation, **manifest}
+
+
+async def publish_loop(interval: float = PUBLISH_INTERVAL_SECONDS):
+    """
+    Writer: publish a new generation whenever the store changed (started
+    from the app lifespan). Skipped while a snapshot import runs; the
+    import publishes once it is complete.
+    """
+    from .vector_db import get_vector_db
+    while True:
+        try:
+            vector_db = await asyncio.to_thread(get_vector_db)
+            changed = vector_db.version != _published_version or current_generation() is None
+            if changed and not vector_db.maintenance_lock.locked():
+                await asyncio.to_thread(publish_generation)
+        except Exception as e:
+            logger.error(f"Publishing generation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+class ReadOnlyIndex:
+    """
+    Brute-force cosine search over a memory-mapped generation. Drop-in for
+    the search side of VectorDBStub (preload, search, close); counts, scrolls
+    and writes need the writer's store.
+    """
+    def __init__(self, generations_dir: str = GENERATIONS_DIR, poll_seconds: float = REPLICA_POLL_SECONDS):
+        self.generations_dir = generations_dir
+        self.poll_seconds = poll_seconds
+        self.generation: Optional[str] = None
+        self.snapshot: Optional[Snapshot] = None
+        self.version = 0
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._refresh(force=True)
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + self.poll_seconds
+            generation = current_generation(self.generations_dir)
+            if generation is None or generation == self.generation:
+                return
+            try:
+                snapshot = Snapshot(os.path.join(self.generations_dir, generation))
+            except (OSError, ValueError) as e:
+                logger.error(f"Cannot load generation {generation}: {e}")
+                return
+            # In-flight searches keep their reference to the previous snapshot
+            self.snapshot, self.generation = snapshot, generation
+            self.version += 1
+            INDEX_GENERATION.set(int(generation))
+            logger.info(f"Serving generation {generation} ({snapshot.count} points)")
+
+    def preload(self) -> int:
+        """
+        Page the vectors in so the first searches do not hit the disk.
+        Returns the number of points.
+        """
+        self._refresh(force=True)
+        snapshot = self.snapshot
+        if snapshot is None:
+            logger.warning(f"No published generation in {self.generations_dir} yet")
+            return 0
+        if snapshot.count:
+            float(np.asarray(snapshot.vectors).sum())
+        return snapshot.count
+
+    def close(self):
+        self.snapshot = None
+
+    @staticmethod
+    def _candidates(snapshot: Snapshot, filter_keys: Optional[List[str]], exclude_keys: Optional[List[str]],
+                    scope: Optional[Dict[str, Any]] = None):
+        """
+        Point indices allowed by the key filters and location scope, or None
+        for all points. Uses only the postings and location columns, so
+        scoped searches score just the candidates.
+        """
+        if not filter_keys and not exclude_keys and not scope:
+            return None
+        if filter_keys:
+            mask = np.zeros(snapshot.count, dtype=bool)
+            for key in filter_keys:
+                mask[snapshot.key_indices(key)] = True
+        else:
+            mask = np.ones(snapshot.count, dtype=bool)
+        for key in exclude_keys or []:
+            mask[snapshot.key_indices(key)] = False
+
+        # Same semantics as vector_db.scope_conditions: overlapping ranges, 0 = no location
+        scope = scope or {}
+        for name in LOCATION_RANGES:
+            low, high = scope.get(f"{name}_from"), scope.get(f"{name}_to")
+            starts = snapshot.locations[:, LOCATION_COLUMNS.index(f"{name}_start")]
+            ends = snapshot.locations[:, LOCATION_COLUMNS.index(f"{name}_end")]
+            if low is not None:
+                mask &= ends >= low
+            if high is not None:
+                mask &= (starts > 0) & (starts <= high)
+        for name in LOCATION_LISTS:
+            value = scope.get(name)
+            if value:
+                allowed = np.zeros(snapshot.count, dtype=bool)
+                allowed[snapshot.facet_indices(f"{name}s", value)] = True
+                mask &= allowed
+        return np.flatnonzero(mask)
+
+    def search(self, query_vector: list, filter_keys: list = None, exclude_keys: list = None, top_k: int = 5,
+               offset: int = 0, scope: Optional[dict] = None):
+        """
+        Same contract as VectorDBStub.search: ScoredPoints, best first.
+        """
+        self._refresh()
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.count == 0:
+            SEARCH_RESULTS.observe(0)
+            return []
+
+        with timed("vector_search"):
+            query = np.asarray(query_vector, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            if norm > 0:
+                query = query / norm
+
+            # Stored vectors are unit length (cosine collection), so the dot product is the score
+            candidates = self._candidates(snapshot, filter_keys, exclude_keys, scope)
+            if candidates is None:
+                scores = snapshot.vectors @ query
+            elif candidates.size:
+                scores = snapshot.vectors[candidates] @ query
+            else:
+                scores = np.zeros(0, dtype=np.float32)
+
+            wanted = min(offset + top_k, scores.size)
+            if wanted <= 0:
+                top = np.zeros(0, dtype=np.int64)
+            else:
+                top = np.argpartition(-scores, wanted - 1)[:wanted] if wanted < scores.size else np.arange(scores.size)
+                top = top[np.argsort(-scores[top], kind="stable")][offset:]
+
+            results = []
+            for i in top:
+                index = int(candidates[i]) if candidates is not None else int(i)
+                point = snapshot.point(index)
+                results.append(models.ScoredPoint(
+                    id=point["id"], version=0, score=float(scores[i]), payload=point["payload"]
+                ))
+        SEARCH_RESULTS.observe(len(results))
+        return results
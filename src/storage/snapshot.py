@@ -0,0 +1,289 @@
+"""
+Snapshot export/import of the vector store.
+
+A snapshot is a directory:
+
+    manifest.json         format version, collection, vector size, point count, embedding model
+    vectors.f32           count x vector_size float32 (little-endian), row i = point i
+    payloads.jsonl        one {"id", "payload"} object per line, line i = point i
+    payload_offsets.u64   count + 1 byte offsets into payloads.jsonl
+    keys.json             key catalog: {key: {"offset", "count"}} into key_postings.u32
+    key_postings.u32      sorted point indices per key
+    locations.i32         count x 6 int32: page, slide and row start/end per point (0 = none)
+    facets.json           {"sheets"|"source_files": {value: {"offset", "count"}}} into facet_postings.u32
+    facet_postings.u32    sorted point indices per sheet / archive member
+
+Every binary file can be memory-mapped, so loading a snapshot is bounded by
+disk bandwidth, not by extraction or embedding.
+
+    python -m src.storage.snapshot export data/snapshots/2025-01-01
+    python -m src.storage.snapshot import data/snapshots/2025-01-01 [--merge]
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from ..metrics import timed
+from .vector_db import (
+    COLLECTION_NAME, VECTOR_SIZE, UPSERT_BATCH_SIZE, LOCATION_RANGES, LOCATION_LISTS, get_vector_db, close_vector_db
+)
+
+logger = logging.getLogger("rog.storage.snapshot")
+
+SNAPSHOT_DIR = os.getenv("ROG_SNAPSHOT_DIR", "data/snapshots")
+SNAPSHOT_FORMAT = "rog-snapshot"
+SNAPSHOT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.jsonl"
+OFFSETS_FILE = "payload_offsets.u64"
+KEYS_FILE = "keys.json"
+POSTINGS_FILE = "key_postings.u32"
+LOCATIONS_FILE = "locations.i32"
+FACETS_FILE = "facets.json"
+FACET_POSTINGS_FILE = "facet_postings.u32"
+# Column order of locations.i32
+LOCATION_COLUMNS = tuple(f"{name}_{edge}" for name in LOCATION_RANGES for edge in ("start", "end"))
+
+
+def _file_sizes(path: str) -> Dict[str, int]:
+    # Location files are absent in snapshots written before they existed
+    names = (VECTORS_FILE, PAYLOADS_FILE, OFFSETS_FILE, KEYS_FILE, POSTINGS_FILE,
+             LOCATIONS_FILE, FACETS_FILE, FACET_POSTINGS_FILE)
+    return {
+        name: os.path.getsize(os.path.join(path, name))
+        for name in names if os.path.exists(os.path.join(path, name))
+    }
+
+
+def _write_postings(out, postings: Dict[str, List[int]], position: int = 0) -> Tuple[Dict[str, Dict[str, int]], int]:
+    """
+    Append sorted index lists back to back. Returns the catalog
+    {value: {"offset", "count"}} and the next free position.
+    """
+    catalog = {}
+    for value in sorted(postings):
+        indices = np.asarray(postings[value], dtype="<u4")
+        out.write(indices.tobytes())
+        catalog[value] = {"offset": position, "count": len(indices)}
+        position += len(indices)
+    return catalog, position
+
+
+def write_snapshot(path: str, points: Iterator[Tuple[Any, List[float], Dict[str, Any]]],
+                   extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Write (id, vector, payload) points as a snapshot directory at `path`.
+    The files are written to a temporary sibling and renamed into place, so
+    `path` never holds a partial snapshot. Returns the manifest.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"Snapshot already exists: {path}")
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path)
+    try:
+        count = 0
+        offset = 0
+        postings: Dict[str, List[int]] = {}
+        facets: Dict[str, Dict[str, List[int]]] = {f"{name}s": {} for name in LOCATION_LISTS}
+        with open(os.path.join(tmp_path, VECTORS_FILE), "wb") as vectors_out, \
+                open(os.path.join(tmp_path, PAYLOADS_FILE), "wb") as payloads_out, \
+                open(os.path.join(tmp_path, OFFSETS_FILE), "wb") as offsets_out, \
+                open(os.path.join(tmp_path, LOCATIONS_FILE), "wb") as locations_out:
+            offsets_out.write(np.uint64(0).tobytes())
+            for point_id, vector, payload in points:
+                row = np.asarray(vector, dtype="<f4")
+                if row.shape != (VECTOR_SIZE,):
+                    raise ValueError(f"Point {point_id} has a vector of shape {row.shape}")
+                vectors_out.write(row.tobytes())
+                line = (json.dumps({"id": point_id, "payload": payload}, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                payloads_out.write(line)
+                offset += len(line)
+                offsets_out.write(np.uint64(offset).tobytes())
+                for key in payload.get("keys") or []:
+                    postings.setdefault(key, []).append(count)
+                locations_out.write(np.asarray(
+                    [payload.get(column) or 0 for column in LOCATION_COLUMNS], dtype="<i4"
+                ).tobytes())
+                for field, values in facets.items():
+                    for value in payload.get(field) or []:
+                        values.setdefault(value, []).append(count)
+                count += 1
+
+        with open(os.path.join(tmp_path, POSTINGS_FILE), "wb") as postings_out:
+            catalog, _ = _write_postings(postings_out, postings)
+        with open(os.path.join(tmp_path, KEYS_FILE), "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False)
+        facet_catalog = {}
+        with open(os.path.join(tmp_path, FACET_POSTINGS_FILE), "wb") as postings_out:
+            position = 0
+            for field, values in facets.items():
+                facet_catalog[field], position = _write_postings(postings_out, values, position)
+        with open(os.path.join(tmp_path, FACETS_FILE), "w", encoding="utf-8") as f:
+            json.dump(facet_catalog, f, ensure_ascii=False)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            "collection": COLLECTION_NAME,
+            "vector_size": VECTOR_SIZE,
+            "distance": "cosine",
+            "count": count,
+            "keys": len(catalog),
+            "files": _file_sizes(tmp_path),
+            **(extra or {})
+        }
+        with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return manifest
+
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot directory.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT or self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Not a version {SNAPSHOT_VERSION} snapshot: {path}")
+        self.count = self.manifest["count"]
+        self.dim = self.manifest["vector_size"]
+        if self.manifest.get("files") != _file_sizes(path):
+            raise ValueError(f"Snapshot files do not match the manifest (truncated copy?): {path}")
+
+        with open(os.path.join(path, KEYS_FILE), encoding="utf-8") as f:
+            self.catalog: Dict[str, Dict[str, int]] = json.load(f)
+        # np.memmap refuses empty files
+        self.vectors = self._map(VECTORS_FILE, "<f4", (self.count, self.dim))
+        self.offsets = self._map(OFFSETS_FILE, "<u8", (self.count + 1,))
+        self.postings = self._map(POSTINGS_FILE, "<u4", (sum(e["count"] for e in self.catalog.values()),))
+        if os.path.exists(os.path.join(path, LOCATIONS_FILE)):
+            with open(os.path.join(path, FACETS_FILE), encoding="utf-8") as f:
+                self.facets: Dict[str, Dict[str, Dict[str, int]]] = json.load(f)
+            self.locations = self._map(LOCATIONS_FILE, "<i4", (self.count, len(LOCATION_COLUMNS)))
+            facet_total = sum(e["count"] for values in self.facets.values() for e in values.values())
+            self.facet_postings = self._map(FACET_POSTINGS_FILE, "<u4", (facet_total,))
+        else:
+            # Older snapshot: payloads carry no locations either
+            self.facets = {}
+            self.locations = np.zeros((self.count, len(LOCATION_COLUMNS)), dtype="<i4")
+            self.facet_postings = np.zeros(0, dtype="<u4")
+        self._payloads_file = open(os.path.join(path, PAYLOADS_FILE), "rb")
+        self._payloads = mmap.mmap(self._payloads_file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b""
+
+    def _map(self, name: str, dtype: str, shape: tuple) -> np.ndarray:
+        if not all(shape):
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode="r", shape=shape)
+
+    def point(self, index: int) -> Dict[str, Any]:
+        """
+        {"id", "payload"} of point `index`.
+        """
+        return json.loads(self._payloads[int(self.offsets[index]):int(self.offsets[index + 1])])
+
+    def key_indices(self, key: str) -> np.ndarray:
+        entry = self.catalog.get(key)
+        if entry is None:
+            return np.zeros(0, dtype="<u4")
+        return self.postings[entry["offset"]:entry["offset"] + entry["count"]]
+
+    def facet_indices(self, field: str, value: str) -> np.ndarray:
+        entry = self.facets.get(field, {}).get(value)
+        if entry is None:
+            return np.zeros(0, dtype="<u4")
+        return self.facet_postings[entry["offset"]:entry["offset"] + entry["count"]]
+
+    def close(self):
+        if isinstance(self._payloads, mmap.mmap):
+            self._payloads.close()
+        self._payloads_file.close()
+        # Drop the maps; the files stay mapped until the arrays are garbage collected
+        self.vectors = self.offsets = self.postings = self.locations = self.facet_postings = None
+
+
+def export_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Export all points of the vector store. Blocking. Writes made while the
+    export runs may or may not be included; a running import is waited for.
+    """
+    from .embeddings import EMBED_MODEL
+    vector_db = get_vector_db()
+    points = ((p.id, p.vector, p.payload) for p in vector_db.scroll_payloads(with_vectors=True))
+    with vector_db.maintenance_lock, timed("snapshot_export"):
+        manifest = write_snapshot(path, points, extra={"embed_model": EMBED_MODEL})
+    logger.info(f"Exported {manifest['count']} points to {path}")
+    return manifest
+
+
+def import_snapshot(path: str, replace: bool = True, batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Load a snapshot into the vector store, keeping point ids. With `replace`
+    the current points are removed first; otherwise snapshot points are
+    added (and overwrite points with the same id). Blocking.
+    """
+    from qdrant_client.http import models
+    from .embeddings import EMBED_MODEL
+    snapshot = Snapshot(path)
+    try:
+        if snapshot.dim != VECTOR_SIZE:
+            raise ValueError(f"Snapshot vector size {snapshot.dim} does not match {VECTOR_SIZE}")
+        if snapshot.manifest.get("embed_model") not in (None, EMBED_MODEL):
+            logger.warning(f"Snapshot was embedded with {snapshot.manifest['embed_model']}, this node uses {EMBED_MODEL}")
+
+        vector_db = get_vector_db()
+        # Exports (and so published generations) wait until the import is complete
+        with vector_db.maintenance_lock:
+            with timed("snapshot_import"):
+                removed = vector_db.delete_points(models.Filter()) if replace else 0
+                for start in range(0, snapshot.count, batch_size):
+                    end = min(start + batch_size, snapshot.count)
+                    points = [snapshot.point(i) for i in range(start, end)]
+                    vector_db.upsert_points(
+                        snapshot.vectors[start:end].tolist(),
+                        [p["payload"] for p in points],
+                        batch_size=batch_size,
+                        ids=[p["id"] for p in points]
+                    )
+            if removed:
+                vector_db.compact()
+        logger.info(f"Imported {snapshot.count} points from {path}")
+        return {"points_imported": snapshot.count, "points_replaced": removed, "manifest": snapshot.manifest}
+    finally:
+        snapshot.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a vector store snapshot")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--merge", action="store_true", help="import: keep existing points")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # The store allows one process at a time: stop the service first
+    try:
+        if args.command == "export":
+            result = export_snapshot(args.path)
+        else:
+            result = import_snapshot(args.path, replace=not args.merge)
+    finally:
+        close_vector_db()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,109 @@
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 import logging
+import os
+import sqlite3
+import threading
+import time
 import uuid
+from typing import Iterable, List, Optional, Set
+from ..metrics import timed, POINTS_UPSERTED, SEARCH_RESULTS
 
 logger = logging.getLogger("rog.storage.vector_db")
 
 COLLECTION_NAME = "rog_documents"
+DB_PATH = "data/qdrant_db"
+VECTOR_SIZE = 384
+# Points per client.upsert call for bulk writes
+UPSERT_BATCH_SIZE = int(os.getenv("ROG_UPSERT_BATCH_SIZE", "1024"))
+# Points per scroll page when collecting payloads (deletes, snapshots)
+SCROLL_PAGE_SIZE = 1024
+# standalone: one process owns the store. writer: also publishes generations
+# for readers. reader: searches the published generation, no writes.
+ROLE = os.getenv("ROG_ROLE", "standalone")
+
+def build_payload(text: str, keys: list, filename: str, chunk_index: int, metadata: dict,
+                  ingested_at: Optional[float] = None) -> dict:
+    """
+    Payload stored with every chunk point.
+    """
+    return {
+        "text": text,
+        "keys": keys,
+        "filename": filename,
+        "chunk_index": chunk_index,
+        **metadata,
+        # Epoch seconds, used by delete-by-age and retention
+        "ingested_at": ingested_at if ingested_at is not None else time.time()
+    }
+
+def file_filter(filename: str) -> models.Filter:
+    """
+    Points of a document, by upload name or stored path. Uploads are stored
+    under their lowercased basename, bulk documents under the exact name given.
+    """
+    names = list(dict.fromkeys([os.path.basename(filename).lower(), filename]))
+    return models.Filter(should=[
+        models.FieldCondition(key="filename", match=models.MatchAny(any=names)),
+        models.FieldCondition(key="original_file", match=models.MatchValue(value=filename)),
+    ])
+
+def keys_filter(keys: List[str]) -> models.Filter:
+    """
+    Points tagged with any of the keys.
+    """
+    return models.Filter(must=[models.FieldCondition(key="keys", match=models.MatchAny(any=keys))])
+
+def ingested_before_filter(cutoff: float) -> models.Filter:
+    """
+    Points ingested before the cutoff (epoch seconds). Points written before
+    ingested_at existed carry no timestamp and never match.
+    """
+    return models.Filter(must=[models.FieldCondition(key="ingested_at", range=models.Range(lt=cutoff))])
+
+# Numeric location ranges (<name>_start/<name>_end) and string location lists
+# (<name>s) in chunk payloads, see chunking.SpanIndex
+LOCATION_RANGES = ("page", "slide", "row")
+LOCATION_LISTS = ("sheet", "source_file")
+
+def scope_conditions(scope: Optional[dict]) -> List[models.FieldCondition]:
+    """
+    Conditions for a location scope such as {"page_from": 3, "page_to": 5,
+    "sheet": "Sales"}. A chunk matches a range when its span overlaps it;
+    chunks without that location never match.
+    """
+    conditions = []
+    for name in LOCATION_RANGES:
+        low, high = (scope or {}).get(f"{name}_from"), (scope or {}).get(f"{name}_to")
+        if low is not None:
+            conditions.append(models.FieldCondition(key=f"{name}_end", range=models.Range(gte=low)))
+        if high is not None:
+            conditions.append(models.FieldCondition(key=f"{name}_start", range=models.Range(lte=high)))
+    for name in LOCATION_LISTS:
+        value = (scope or {}).get(name)
+        if value:
+            conditions.append(models.FieldCondition(key=f"{name}s", match=models.MatchValue(value=value)))
+    return conditions
+
+def combine_filters(filters: Iterable[models.Filter]) -> models.Filter:
+    """
+    AND of several filters.
+    """
+    return models.Filter(must=list(filters))
 
 class VectorDBStub:
     """
     Qdrant client using local disk storage for persistence.
     """
-    def __init__(self):
+    def __init__(self, db_path: str = DB_PATH):
         # Using local disk storage
-        self.db_path = "data/qdrant_db"
+        self.db_path = db_path
+        # Local mode is not thread-safe; batchers write from worker threads
+        self._lock = threading.Lock()
+        # Bumped on every write, tells the writer when to publish a generation
+        self.version = 0
+        # Held by snapshot import and export, so no export sees a half-imported store
+        self.maintenance_lock = threading.Lock()
         # Ensure path exists? Qdrant handles it usually, but let's be safe if needed or let library handle.
         # Actually Qdrant local mode creates it.
         self.client = QdrantClient(path=self.db_path) 
@@ -23,7 +113,7 @@ class VectorDBStub:
         try:
             self.client.create_collection(
                 collection_name=COLLECTION_NAME,
-                vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE),
+                vectors_config=models.VectorParams(size=VECTOR_SIZE, distance=models.Distance.COSINE),
             )
             logger.info(f"Collection {COLLECTION_NAME} created.")
         except Exception:
@@ -34,32 +124,134 @@ class VectorDBStub:
         """
         Upsert processed chunks into the DB.
         """
-        points = []
-        for i, (text, vector) in enumerate(zip(chunks, embeddings)):
-            point_id = str(uuid.uuid4())
-            payload = {
-                "text": text,
-                "keys": keys,
-                "filename": filename,
-                "chunk_index": i,
-                **metadata
-            }
-            
-            points.append(models.PointStruct(
-                id=point_id,
-                vector=vector,
-                payload=payload
-            ))
-            
-        self.client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=points
-        )
-        logger.info(f"Upserted {len(points)} chunks for {filename}")
+        payloads = [
+            build_payload(text, keys, filename, i, metadata)
+            for i, text in enumerate(chunks)
+        ]
+        self.upsert_points(embeddings, payloads)
+        logger.info(f"Upserted {len(payloads)} chunks for {filename}")
+
+    def upsert_points(self, vectors: list, payloads: list, batch_size: int = UPSERT_BATCH_SIZE,
+                      ids: Optional[list] = None) -> int:
+        """
+        Upsert prepared (vector, payload) pairs, split into large batches.
+        New points get random ids unless `ids` is given (snapshot import).
+        Returns the number of points written.
+        """
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in payloads]
+        for start in range(0, len(payloads), batch_size):
+            end = start + batch_size
+            points = [
+                models.PointStruct(id=point_id, vector=vector, payload=payload)
+                for point_id, vector, payload in zip(ids[start:end], vectors[start:end], payloads[start:end])
+            ]
+            with timed("upsert_points"), self._lock:
+                self.client.upsert(
+                    collection_name=COLLECTION_NAME,
+                    points=points
+                )
+                self.version += 1
+            POINTS_UPSERTED.inc(len(points))
+        return len(payloads)
 
-    def search(self, query_vector: list, filter_keys: list = None, exclude_keys: list = None, top_k: int = 5):
+    def preload(self) -> int:
         """
-        Search for similar chunks.
+        Touch the collection so its points are loaded before the first search.
+        Returns the number of stored points.
+        """
+        with self._lock:
+            return self.client.count(collection_name=COLLECTION_NAME, exact=True).count
+
+    def close(self):
+        self.client.close()
+
+    def count(self, query_filter: Optional[models.Filter] = None) -> int:
+        with self._lock:
+            return self.client.count(collection_name=COLLECTION_NAME, count_filter=query_filter, exact=True).count
+
+    def scroll_payloads(self, query_filter: Optional[models.Filter] = None, fields: Optional[List[str]] = None,
+                        with_vectors: bool = False):
+        """
+        Iterate over matching points page by page (the lock is only held per page).
+        `fields` limits the returned payload keys.
+        """
+        with_payload = models.PayloadSelectorInclude(include=fields) if fields else True
+        offset = None
+        while True:
+            with self._lock:
+                points, offset = self.client.scroll(
+                    collection_name=COLLECTION_NAME,
+                    scroll_filter=query_filter,
+                    limit=SCROLL_PAGE_SIZE,
+                    offset=offset,
+                    with_payload=with_payload,
+                    with_vectors=with_vectors
+                )
+            yield from points
+            if offset is None:
+                break
+
+    def source_files(self, query_filter: Optional[models.Filter] = None) -> Set[str]:
+        """
+        Stored upload paths (payload original_file) of the matching points.
+        """
+        return {
+            p.payload["original_file"]
+            for p in self.scroll_payloads(query_filter, fields=["original_file"])
+            if p.payload.get("original_file")
+        }
+
+    def delete_points(self, query_filter: models.Filter) -> int:
+        """
+        Delete all points matching the filter. Returns the number removed.
+        """
+        with timed("delete_points"), self._lock:
+            deleted = self.client.count(collection_name=COLLECTION_NAME, count_filter=query_filter, exact=True).count
+            if deleted:
+                self.client.delete(
+                    collection_name=COLLECTION_NAME,
+                    points_selector=models.FilterSelector(filter=query_filter)
+                )
+                self.version += 1
+        if deleted:
+            logger.info(f"Deleted {deleted} points")
+        return deleted
+
+    @property
+    def storage_file(self) -> str:
+        # Local mode keeps each collection in one SQLite file
+        return os.path.join(self.db_path, "collection", COLLECTION_NAME, "storage.sqlite")
+
+    def compact(self) -> dict:
+        """
+        Rewrite the on-disk store without the space of deleted points, and
+        reopen the client: local mode keeps deleted points in its in-memory
+        arrays (and scans them on every search) until the collection is reloaded.
+        """
+        with timed("compact"), self._lock:
+            size_before = os.path.getsize(self.storage_file) if os.path.exists(self.storage_file) else 0
+            self.client.close()
+            try:
+                if os.path.exists(self.storage_file):
+                    conn = sqlite3.connect(self.storage_file)
+                    try:
+                        conn.execute("VACUUM")
+                    finally:
+                        conn.close()
+            finally:
+                self.client = QdrantClient(path=self.db_path)
+                self._ensure_collection()
+            size_after = os.path.getsize(self.storage_file) if os.path.exists(self.storage_file) else 0
+            points = self.client.count(collection_name=COLLECTION_NAME, exact=True).count
+        logger.info(f"Compacted vector store: {size_before} -> {size_after} bytes, {points} points")
+        return {"points": points, "bytes_before": size_before, "bytes_after": size_after}
+
+    def search(self, query_vector: list, filter_keys: list = None, exclude_keys: list = None, top_k: int = 5,
+               offset: int = 0, scope: Optional[dict] = None):
+        """
+        Search for similar chunks. `offset` skips the best hits (pagination),
+        `scope` restricts them to a location (see scope_conditions).
         """
         # Build filters
         should_conditions = None
@@ -77,9 +269,13 @@ class VectorDBStub:
                 for k in exclude_keys
             ]
             
-        if should_conditions or must_not_conditions:
+        must_conditions = scope_conditions(scope) or None
+
+        query_filter = None
+        if should_conditions or must_not_conditions or must_conditions:
             query_filter = models.Filter(
                 should=should_conditions,
+                must=must_conditions,
                 must_not=must_not_conditions
             )
             
@@ -87,19 +283,40 @@ class VectorDBStub:
         # qdrant-client >= 1.7.0 uses query_points or search (but search might be deprecated/removed in some contexts or I'm using an async client? No, synchronous.)
         # The error said 'QdrantClient' object has no attribute 'search'.
         # Let's use query_points which is the lower level point search.
-        results = self.client.query_points(
-            collection_name=COLLECTION_NAME,
-            query=query_vector,
-            query_filter=query_filter,
-            limit=top_k
-        ).points
+        with timed("vector_search"), self._lock:
+            results = self.client.query_points(
+                collection_name=COLLECTION_NAME,
+                query=query_vector,
+                query_filter=query_filter,
+                limit=top_k,
+                offset=offset or None
+            ).points
+        SEARCH_RESULTS.observe(len(results))
         return results
 
 # Singleton
 _vector_db = None
+# Warm-up, jobs and deletes may ask for the client from different threads at once;
+# a second client on the same path would fail on the storage lock
+_vector_db_lock = threading.Lock()
 
 def get_vector_db():
     global _vector_db
     if _vector_db is None:
-        _vector_db = VectorDBStub()
+        with _vector_db_lock:
+            if _vector_db is None:
+                if ROLE == "reader":
+                    from .replica import ReadOnlyIndex
+                    _vector_db = ReadOnlyIndex()
+                else:
+                    _vector_db = VectorDBStub()
     return _vector_db
+
+def close_vector_db():
+    """
+    Release the client (and the on-disk lock) if it was opened.
+    """
+    global _vector_db
+    if _vector_db is not None:
+        _vector_db.close()
+        _vector_db = None
@@ -39,16 +39,17 @@ def test_ingest():
         job_id = r.json().get("job_id")
         print(f"Tracking Job {job_id}...")
         
-        while True:
-            r_job = requests.get(f"{BASE_URL}/job/{job_id}")
-            job_status = r_job.json().get("status")
-            print(f"Job Status: {job_status}")
-            
-            if job_status in ["COMPLETED", "FAILED", "PARTIAL"]:
-                print("Final Job Result:", json.dumps(r_job.json(), indent=2))
-                break
-            
-            time.sleep(1)
+        # Follow the job's event stream instead of polling; it ends when the job is done
+        with requests.get(f"{BASE_URL}/job/{job_id}/events", stream=True) as r_events:
+            event_type = None
+            for line in r_events.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event_type = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    print(f"Job Event [{event_type}]: {line[len('data:'):].strip()}")
+        
+        r_job = requests.get(f"{BASE_URL}/job/{job_id}")
+        print("Final Job Result:", json.dumps(r_job.json(), indent=2))
     
     # Ingest Car
     files = {'file': open('test_car.txt', 'rb')}
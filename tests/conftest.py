@@ -0,0 +1,27 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """
+    Fresh job store and Qdrant store under tmp_path, with the hash embedder
+    from the benchmark suite standing in for the sentence-transformers model.
+    """
+    from benchmarks.stubs import HashEmbeddingService
+    from src.processing import jobs
+    from src.storage import embeddings, vector_db
+
+    job_manager = jobs.JobManager(db_path=str(tmp_path / "jobs.db"))
+    vdb = vector_db.VectorDBStub(db_path=str(tmp_path / "qdrant_db"))
+    monkeypatch.setattr(jobs, "_job_manager", job_manager)
+    monkeypatch.setattr(vector_db, "_vector_db", vdb)
+    monkeypatch.setattr(embeddings, "_embedding_service", HashEmbeddingService())
+    yield job_manager, vdb
+    vdb.close()
+    job_manager.conn.close()
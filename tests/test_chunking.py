@@ -0,0 +1,105 @@
+import random
+from src.processing.chunking import SpanIndex, chunk_with_offsets, recursive_character_chunking
+
+
+def test_short_header_then_unbroken_text_terminates():
+    # The first break is right after the header, so the overlap used to send start backwards forever
+    text = "Title\n" + "x" * 5000
+    chunks = chunk_with_offsets(text)
+    assert chunks[0] == ("Title", 0, 5)
+    assert "".join(chunk for chunk, _, _ in chunks[1:]).count("x") >= 5000
+    assert all(len(chunk) <= 1000 for chunk, _, _ in chunks)
+
+
+def test_offsets_point_at_the_chunks():
+    rng = random.Random(7)
+    words = ["alpha", "beta.", "gamma\n", "  delta", "epsilon. ", "\n\n"]
+    text = "".join(rng.choice(words) for _ in range(3000))
+    chunks = chunk_with_offsets(text, chunk_size=300, overlap=40)
+    assert chunks
+    for chunk, start, end in chunks:
+        assert text[start:end] == chunk
+    assert [chunk for chunk, _, _ in chunks] == recursive_character_chunking(text, 300, 40)
+
+
+def test_chunks_do_not_cross_boundaries():
+    text = "one two three. " * 50 + "four five six. " * 50
+    boundary = len("one two three. ") * 50
+    chunks = chunk_with_offsets(text, chunk_size=200, overlap=20, boundaries=[boundary])
+    for chunk, start, end in chunks:
+        assert text[start:end] == chunk
+        assert end <= boundary or start >= boundary
+
+
+def test_locate_pages():
+    index = SpanIndex([
+        {"start": 0, "end": 100, "page": 1},
+        {"start": 101, "end": 250, "page": 2},
+        {"start": 251, "end": 400, "page": 3},
+    ])
+    assert index.locate(10, 50) == {"page_start": 1, "page_end": 1}
+    assert index.locate(90, 260) == {"page_start": 1, "page_end": 3}
+    assert index.locate(251, 300) == {"page_start": 3, "page_end": 3}
+    assert index.locate(500, 600) == {}
+
+
+def test_locate_slides():
+    index = SpanIndex([
+        {"start": 0, "end": 40, "slide": 1},
+        {"start": 41, "end": 90, "slide": 3},
+    ])
+    assert index.locate(0, 90) == {"slide_start": 1, "slide_end": 3}
+    assert index.locate(50, 60) == {"slide_start": 3, "slide_end": 3}
+
+
+def test_sheet_rows_stay_within_one_sheet():
+    rows = [("Sales", 1, "a | 1"), ("Sales", 2, "b | 2"), ("Costs", 1, "c | 3"), ("Costs", 2, "d | 4")]
+    spans, lines, position = [], [], 0
+    for sheet, row, line in rows:
+        spans.append({"start": position, "end": position + len(line), "sheet": sheet, "row": row})
+        lines.append(line)
+        position += len(line) + 1
+    text = "\n".join(lines)
+    index = SpanIndex(spans)
+
+    assert index.boundaries() == [spans[1]["end"]]
+    located = [index.locate(start, end) for _, start, end in chunk_with_offsets(text, boundaries=index.boundaries())]
+    assert located == [
+        {"sheets": ["Sales"], "row_start": 1, "row_end": 2},
+        {"sheets": ["Costs"], "row_start": 1, "row_end": 2},
+    ]
+
+
+def test_same_sheet_name_in_another_workbook_is_a_boundary():
+    spans = [
+        {"start": 0, "end": 5, "sheet": "Sheet1", "row": 1},
+        {"start": 6, "end": 11, "sheet": "Sheet1", "row": 2},
+        {"start": 12, "end": 17, "sheet": "Sheet1", "row": 1},
+    ]
+    assert SpanIndex(spans).boundaries() == [11]
+
+
+def test_archive_members_are_never_mixed():
+    # Layout of load_archive: a heading line, then the member text and its shifted spans
+    parts, spans, position = [], [], 0
+    for member, pages in [("a.pdf", 10), ("b.pdf", 3)]:
+        heading = f"--- FILE: {member} ---"
+        parts.append(heading)
+        position += len(heading) + 1
+        member_start = position
+        for page in range(1, pages + 1):
+            line = f"Page {page} of {member}. " * 3
+            parts.append(line)
+            spans.append({"start": position, "end": position + len(line), "page": page})
+            position += len(line) + 1
+        spans.append({"start": member_start, "end": position - 1, "source_file": member})
+    text = "\n".join(parts)
+    index = SpanIndex(spans)
+
+    chunks = chunk_with_offsets(text, chunk_size=400, overlap=50, boundaries=index.boundaries())
+    located = [index.locate(start, end) for _, start, end in chunks]
+    assert all(len(fields["source_files"]) == 1 for fields in located)
+    last_of_a = max(i for i, fields in enumerate(located) if fields["source_files"] == ["a.pdf"])
+    first_of_b = located[last_of_a + 1]
+    assert first_of_b["page_start"] == 1 and first_of_b["page_end"] <= 3
+    assert chunks[last_of_a + 1][0].startswith("--- FILE: b.pdf ---")
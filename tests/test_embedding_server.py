@@ -0,0 +1,105 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from benchmarks.stubs import HashEmbeddingService
+from src.storage import embedding_server, embeddings
+from src.storage.embedding_server import EmbeddingServer, RemoteEmbeddingService
+
+
+class FlakyModel(HashEmbeddingService):
+    """
+    Fails every batch that contains the text "poison".
+    """
+    def __init__(self, model_name=None):
+        super().__init__()
+
+    def embed_array(self, texts: list):
+        if "poison" in texts:
+            raise RuntimeError("model failed")
+        return super().embed_array(texts)
+
+
+@pytest.fixture
+def server_socket(tmp_path, monkeypatch):
+    monkeypatch.setattr(embeddings, "EmbeddingService", FlakyModel)
+    # A wide window so concurrent requests land in one batch
+    monkeypatch.setattr(embedding_server, "BATCH_WINDOW_SECONDS", 0.2)
+    path = str(tmp_path / "embed.sock")
+    server = EmbeddingServer(path)
+    running = {}
+    started = threading.Event()
+
+    async def run():
+        running["loop"], running["stop"] = asyncio.get_running_loop(), asyncio.Event()
+        serving = asyncio.create_task(server.serve())
+        started.set()
+        await running["stop"].wait()
+        serving.cancel()
+
+    # asyncio.run also cancels the connection handlers still open at the end
+    thread = threading.Thread(target=lambda: asyncio.run(run()), daemon=True)
+    thread.start()
+    started.wait(5)
+    deadline = time.monotonic() + 5
+    while not (tmp_path / "embed.sock").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield path
+    running["loop"].call_soon_threadsafe(running["stop"].set)
+    thread.join(timeout=5)
+
+
+def _raw_request(path: str, payload: bytes) -> dict:
+    client = RemoteEmbeddingService(path)
+    sock = client._connect()
+    try:
+        sock.sendall(embedding_server.HEADER.pack(len(payload)) + payload)
+        length = bytearray(embedding_server.HEADER.size)
+        client._recv_into(sock, length)
+        header = bytearray(embedding_server.HEADER.unpack(length)[0])
+        client._recv_into(sock, header)
+        return json.loads(header)
+    finally:
+        sock.close()
+
+
+@pytest.mark.parametrize("texts", ["abc", [1, 2], ["ok", None], {"a": 1}])
+def test_rejects_texts_that_are_not_strings(server_socket, texts):
+    request = json.dumps({"op": "encode", "texts": texts}).encode("utf-8")
+    assert _raw_request(server_socket, request) == {"error": "texts must be a list of strings"}
+
+
+def test_rejects_malformed_requests(server_socket):
+    assert "error" in _raw_request(server_socket, b"not json")
+    assert "error" in _raw_request(server_socket, b"[1, 2]")
+    # The connection survives a bad request
+    client = RemoteEmbeddingService(server_socket)
+    assert client.embed_array(["still works"]).shape == (1, client.dim)
+
+
+def test_failed_batch_only_fails_the_bad_request(server_socket):
+    results = {}
+
+    def call(name, texts):
+        client = RemoteEmbeddingService(server_socket)
+        try:
+            results[name] = client.embed_array(texts)
+        except RuntimeError as e:
+            results[name] = e
+
+    threads = [
+        threading.Thread(target=call, args=("good", ["roses", "tulips"])),
+        threading.Thread(target=call, args=("bad", ["poison"])),
+        threading.Thread(target=call, args=("other", ["engine"])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert isinstance(results["bad"], RuntimeError)
+    assert results["good"].shape == (2, 384)
+    assert results["other"].shape == (1, 384)
+    expected = HashEmbeddingService().embed_array(["roses", "tulips"])
+    assert (results["good"] == expected).all()
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from src.processing.events import stream_job_events
+from src.processing.jobs import JobStatus
+
+
+def _parse(frame: str):
+    fields = dict(line.split(": ", 1) for line in frame.strip().splitlines())
+    return int(fields["id"]), fields["event"], json.loads(fields["data"])
+
+
+async def _collect(job_ids, last_event_id=None, during=None):
+    """
+    All frames of a stream (heartbeats skipped). `during` runs after the
+    first frame, while the stream waits for live events.
+    """
+    frames = []
+    async for frame in stream_job_events(job_ids, last_event_id, heartbeat_seconds=5):
+        if frame.startswith(":"):
+            continue
+        frames.append(_parse(frame))
+        if during is not None and len(frames) == 1:
+            during()
+    return frames
+
+
+def test_finished_job_sends_snapshot_and_closes(stores):
+    job_manager, _ = stores
+    job_id = job_manager.create_job()
+    job_manager.update_job_status(job_id, JobStatus.COMPLETED)
+
+    frames = asyncio.run(asyncio.wait_for(_collect([job_id]), 5))
+    assert [event for _, event, _ in frames] == ["snapshot"]
+    assert frames[0][2]["job"]["status"] == "COMPLETED"
+
+
+def test_live_events_until_terminal_status(stores):
+    job_manager, _ = stores
+    job_id = job_manager.create_job()
+
+    def work():
+        job_manager.update_progress(job_id, "chunked", chunks_total=3)
+        job_manager.add_error(job_id, "bad page", "a.pdf")
+        job_manager.update_job_status(job_id, JobStatus.PARTIAL)
+
+    frames = asyncio.run(asyncio.wait_for(_collect([job_id], during=work), 5))
+    assert [event for _, event, _ in frames] == ["snapshot", "progress", "job_error", "status"]
+    assert frames[1][2]["chunks_total"] == 3
+    assert frames[2][2] == {"job_id": job_id, "file": "a.pdf", "error": "bad page"}
+    assert frames[3][2]["status"] == "PARTIAL"
+
+
+def test_resume_replays_only_missed_events(stores):
+    job_manager, _ = stores
+    job_id = job_manager.create_job()
+
+    def work():
+        job_manager.update_progress(job_id, "chunked", chunks_total=3)
+        job_manager.update_job_status(job_id, JobStatus.COMPLETED)
+
+    frames = asyncio.run(asyncio.wait_for(_collect([job_id], during=work), 5))
+    progress_id = frames[1][0]
+
+    resumed = asyncio.run(asyncio.wait_for(_collect([job_id], last_event_id=progress_id), 5))
+    assert [(event_id, event) for event_id, event, _ in resumed] == [(frames[2][0], "status")]
+
+
+def test_unknown_resume_id_falls_back_to_snapshot(stores):
+    job_manager, _ = stores
+    job_id = job_manager.create_job()
+    job_manager.update_job_status(job_id, JobStatus.FAILED)
+
+    frames = asyncio.run(asyncio.wait_for(_collect([job_id], last_event_id=10 ** 9), 5))
+    assert [event for _, event, _ in frames] == ["snapshot"]
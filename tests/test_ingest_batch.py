@@ -0,0 +1,78 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from src import main
+
+
+def test_same_name_uploads_do_not_overwrite(stores, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    job_manager, vdb = stores
+    client = TestClient(main.app)
+
+    response = client.post("/ingest/batch", data={"keys": json.dumps(["batch"])}, files=[
+        ("files", ("notes.txt", b"Roses are red and grow in gardens.", "text/plain")),
+        ("files", ("notes.txt", b"Engines need torque and bolts.", "text/plain")),
+    ])
+    assert response.status_code == 200
+    children = response.json()["children"]
+    assert [c["filename"] for c in children] == ["notes.txt", "notes.txt"]
+
+    payloads = [r.payload for r in vdb.scroll_payloads(fields=["text", "filename", "original_file"])]
+    assert sorted(p["text"] for p in payloads) == [
+        "Engines need torque and bolts.", "Roses are red and grow in gardens."
+    ]
+    assert {p["filename"] for p in payloads} == {"notes.txt"}
+    assert len({p["original_file"] for p in payloads}) == 2
+    for child in children:
+        assert job_manager.get_job(child["job_id"])["status"] == "COMPLETED"
+
+
+class FailingEmbedder:
+    """
+    Wraps an embedder and fails its first `failures` embed_batch calls.
+    """
+    def __init__(self, inner, failures):
+        self.inner = inner
+        self.failures = failures
+
+    def embed_batch(self, texts):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("embedding failed")
+        return self.inner.embed_batch(texts)
+
+
+def _run_batch(stores, tmp_path, monkeypatch, failures, texts):
+    from src.processing import batching, ingest
+    from src.storage import embeddings
+    job_manager, _ = stores
+    monkeypatch.setattr(embeddings, "_embedding_service", FailingEmbedder(embeddings._embedding_service, failures))
+    # Two chunks per batch: the second file's first chunk flushes a batch shared with the first file
+    monkeypatch.setattr(batching.ChunkBatcher.__init__, "__defaults__", (2, None, None))
+    paths = []
+    for i, text in enumerate(texts):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(text)
+        paths.append(str(path))
+    job_id = job_manager.create_job()
+    children = [job_manager.create_job() for _ in paths]
+    asyncio.run(ingest.process_batch_job(paths, ["batch"], {}, job_id, children))
+    return job_manager.get_job(job_id), [job_manager.get_job(c) for c in children]
+
+
+def test_failed_shared_flush_fails_every_child_in_it(stores, tmp_path, monkeypatch):
+    parent, children = _run_batch(stores, tmp_path, monkeypatch, failures=1, texts=[
+        "Roses are red.", "Engines need torque.", "Invoices need audits."
+    ])
+    # doc0 and doc1 shared the failed batch, doc2 went through the final flush
+    assert [c["status"] for c in children] == ["FAILED", "FAILED", "COMPLETED"]
+    assert parent["status"] == "PARTIAL"
+    assert parent["result"]["failed_count"] == 2
+    assert stores[1].count() == 1
+
+
+def test_failed_final_flush_leaves_no_child_running(stores, tmp_path, monkeypatch):
+    parent, children = _run_batch(stores, tmp_path, monkeypatch, failures=10, texts=["Roses are red."])
+    assert [c["status"] for c in children] == ["FAILED"]
+    assert parent["status"] == "FAILED"
+    assert parent["result"]["failed_count"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import pytest
+from src.processing.ingest import process_ndjson_stream
+from src.storage.vector_db import VECTOR_SIZE
+
+
+async def _lines(docs):
+    for doc in docs:
+        yield doc if isinstance(doc, bytes) else json.dumps(doc).encode("utf-8")
+
+
+def run_bulk(stores, docs, keys=None):
+    job_manager, _ = stores
+    job_id = job_manager.create_job()
+    result = asyncio.run(process_ndjson_stream(_lines(docs), keys or ["bulk"], job_id))
+    return result, job_manager.get_job(job_id)
+
+
+def test_text_and_chunks_are_indexed(stores):
+    result, job = run_bulk(stores, [
+        {"text": "Roses are red. " * 10, "filename": "a.txt"},
+        {"chunks": ["first chunk", "second chunk"], "keys": ["other"]},
+    ])
+    assert result["status"] == "COMPLETED"
+    assert result["document_count"] == 2
+    assert result["error_count"] == 0
+    assert stores[1].count() == result["chunk_count"] == 3
+
+
+def test_precomputed_vectors_skip_embedding(stores):
+    vector = [1.0] + [0] * (VECTOR_SIZE - 1)
+    result, _ = run_bulk(stores, [{"chunks": ["given"], "vectors": [vector]}])
+    assert result["status"] == "COMPLETED"
+    assert result["embedded_count"] == 0
+    assert stores[1].count() == 1
+
+
+@pytest.mark.parametrize("doc, error", [
+    ({"chunks": None}, "chunks must be a list of strings"),
+    ({"chunks": "abc"}, "chunks must be a list of strings"),
+    ({"chunks": ["ok", 3]}, "chunks must be a list of strings"),
+    ({"text": None}, "text must be a string"),
+    ({"text": ["a", "b"]}, "text must be a string"),
+    ({"chunks": ["a"], "vectors": "x"}, "one vector per chunk"),
+    ({"chunks": ["a"], "vectors": [None]}, f"lists of {VECTOR_SIZE} numbers"),
+    ({"chunks": ["a"], "vectors": [[0.1] * (VECTOR_SIZE - 1)]}, f"lists of {VECTOR_SIZE} numbers"),
+    ({"chunks": ["a"], "vectors": [["x"] * VECTOR_SIZE]}, "only numbers"),
+    ({"chunks": ["a"], "keys": "k"}, "keys must be a list of strings"),
+    ({"chunks": ["a"], "metadata": [1]}, "metadata must be an object"),
+    ({"filename": "nothing.txt"}, "needs 'text' or 'chunks'"),
+    ([1, 2], "must be a JSON object"),
+])
+def test_invalid_lines_are_skipped(stores, doc, error):
+    result, job = run_bulk(stores, [doc, {"chunks": ["valid chunk"]}])
+    assert result["status"] == "PARTIAL"
+    assert result["document_count"] == 1
+    assert result["error_count"] == 1
+    assert stores[1].count() == 1
+    assert len(job["errors"]) == 1
+    assert job["errors"][0]["error"].startswith("line 1:")
+    assert error in job["errors"][0]["error"]
+
+
+def test_malformed_json_and_blank_lines(stores):
+    result, job = run_bulk(stores, [b"{not json", b"   ", {"chunks": ["valid chunk"]}])
+    assert result["status"] == "PARTIAL"
+    assert result["error_count"] == 1
+    assert job["errors"][0]["error"].startswith("line 1:")
+
+
+def test_only_invalid_lines_fail_the_job(stores):
+    result, _ = run_bulk(stores, [{"chunks": None}, {"text": 5}])
+    assert result["status"] == "FAILED"
+    assert result["document_count"] == 0
+    assert stores[1].count() == 0
+
+
+def test_bulk_documents_delete_by_their_given_name(stores):
+    from src.processing.retention import delete_documents
+    from src.storage.vector_db import file_filter
+    run_bulk(stores, [
+        {"chunks": ["quarterly numbers"], "filename": "Report.txt"},
+        {"chunks": ["nested"], "filename": "exports/2024/Summary.TXT"},
+        {"chunks": ["kept"], "filename": "other.txt"},
+    ])
+    assert delete_documents(file_filter("Report.txt"))["points_deleted"] == 1
+    assert delete_documents(file_filter("exports/2024/Summary.TXT"))["points_deleted"] == 1
+    assert stores[1].count() == 1
+
+
+def test_stored_line_errors_are_capped(stores, monkeypatch):
+    from src.processing import ingest
+    monkeypatch.setattr(ingest, "MAX_BULK_ERRORS", 10)
+    result, job = run_bulk(stores, [{"chunks": None}] * 50 + [{"chunks": ["valid chunk"]}])
+    assert result["error_count"] == 50
+    assert len(job["errors"]) == 10
+    assert job["errors"][-1]["error"].startswith("line 10:")
@@ -0,0 +1,35 @@
+from src.processing.jobs import JobManager, JobStatus
+
+
+def _age(manager, job_id, seconds):
+    manager.conn.execute("UPDATE jobs SET updated_at = updated_at - ? WHERE id = ?", (seconds, job_id))
+
+
+def test_ttl_only_evicts_finished_jobs(tmp_path):
+    manager = JobManager(db_path=str(tmp_path / "jobs.db"), ttl_seconds=60, max_rows=0)
+    jobs = {status: manager.create_job() for status in JobStatus}
+    for status, job_id in jobs.items():
+        manager.update_job_status(job_id, status)
+        _age(manager, job_id, 3600)
+
+    assert manager.evict() == 3
+    for status, job_id in jobs.items():
+        kept = manager.get_job(job_id) is not None
+        assert kept == (status in (JobStatus.PENDING, JobStatus.PROCESSING))
+
+
+def test_row_cap_keeps_running_jobs(tmp_path):
+    manager = JobManager(db_path=str(tmp_path / "jobs.db"), ttl_seconds=0, max_rows=2)
+    running = [manager.create_job() for _ in range(3)]
+    for i, job_id in enumerate(running):
+        manager.update_job_status(job_id, JobStatus.PROCESSING)
+        _age(manager, job_id, 1000 + i)
+    finished = [manager.create_job() for _ in range(4)]
+    for i, job_id in enumerate(finished):
+        manager.update_job_status(job_id, JobStatus.COMPLETED)
+        _age(manager, job_id, 100 - i)
+
+    assert manager.evict() == 2
+    assert all(manager.get_job(job_id) for job_id in running)
+    # The two most recently finished jobs stay
+    assert [manager.get_job(job_id) is not None for job_id in finished] == [False, False, True, True]
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import threading
+from qdrant_client.http import models
+from src.storage import replica
+from src.storage.snapshot import Snapshot, export_snapshot, import_snapshot
+
+
+def _ingest(vdb, texts, keys):
+    from src.storage.embeddings import get_embedding_service
+    from src.storage.vector_db import build_payload
+    vectors = get_embedding_service().embed_batch(texts)
+    vdb.upsert_points(vectors, [build_payload(t, keys, "doc.txt", i, {}) for i, t in enumerate(texts)])
+
+
+def test_publish_waits_for_running_import(stores, tmp_path):
+    _, vdb = stores
+    generations = str(tmp_path / "generations")
+    _ingest(vdb, [f"imported chunk {i}" for i in range(40)], ["new"])
+    export_snapshot(str(tmp_path / "snap"))
+    vdb.delete_points(models.Filter())
+    _ingest(vdb, [f"old chunk {i}" for i in range(5)], ["old"])
+
+    published = []
+    stop = threading.Event()
+
+    def publish_repeatedly():
+        while not stop.is_set():
+            published.append(replica.publish_generation(generations, keep=100)["generation"])
+
+    publisher = threading.Thread(target=publish_repeatedly)
+    publisher.start()
+    try:
+        import_snapshot(str(tmp_path / "snap"), replace=True, batch_size=4)
+    finally:
+        stop.set()
+        publisher.join()
+
+    # Every generation is either the store before or after the import, never in between
+    counts = {Snapshot(os.path.join(generations, g)).count for g in published}
+    assert counts <= {5, 40}
+    assert replica.publish_generation(generations)["count"] == 40
+
+
+def test_publish_loop_skips_during_import(stores, tmp_path, monkeypatch):
+    _, vdb = stores
+    calls = []
+    monkeypatch.setattr(replica, "publish_generation", lambda: calls.append(1))
+
+    async def one_round():
+        task = asyncio.create_task(replica.publish_loop(interval=3600))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    with vdb.maintenance_lock:
+        asyncio.run(one_round())
+    assert calls == []
+    asyncio.run(one_round())
+    assert calls == [1]
+
+
+def test_reader_serves_published_generation(stores, tmp_path):
+    from src.storage.embeddings import get_embedding_service
+    _, vdb = stores
+    generations = str(tmp_path / "generations")
+    _ingest(vdb, ["roses and tulips", "engine torque", "invoice and audit"], ["docs"])
+    replica.publish_generation(generations)
+
+    reader = replica.ReadOnlyIndex(generations)
+    assert reader.preload() == 3
+    assert not hasattr(reader, "count")
+    query = get_embedding_service().embed_text("engine torque")
+    expected = vdb.search(query, top_k=3)
+    results = reader.search(query, top_k=3)
+    assert results[0].id == expected[0].id
+    # Equal scores may come back in a different order
+    assert [round(p.score, 5) for p in results] == [round(p.score, 5) for p in expected]
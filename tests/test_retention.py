@@ -0,0 +1,48 @@
+import time
+from src.processing import retention
+from src.processing.jobs import JobStatus
+from src.storage.vector_db import build_payload
+
+
+def _compactions(monkeypatch, job_manager, vdb):
+    calls = []
+    monkeypatch.setattr(vdb, "compact", lambda: calls.append("vector_store") or {})
+    monkeypatch.setattr(job_manager, "compact", lambda: calls.append("job_store") or 0)
+    return calls
+
+
+def test_jobs_only_do_not_compact_vector_store(stores, tmp_path, monkeypatch):
+    job_manager, vdb = stores
+    monkeypatch.setattr(retention, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    calls = _compactions(monkeypatch, job_manager, vdb)
+    job_manager.ttl_seconds = 60
+    job_id = job_manager.create_job()
+    job_manager.update_job_status(job_id, JobStatus.COMPLETED)
+    job_manager.conn.execute("UPDATE jobs SET updated_at = updated_at - 3600")
+
+    result = retention.apply_retention(days=1)
+    assert result["points_deleted"] == 0
+    assert result["jobs_evicted"] == 1
+    assert calls == ["job_store"]
+
+
+def test_deleted_points_compact_vector_store(stores, tmp_path, monkeypatch):
+    job_manager, vdb = stores
+    monkeypatch.setattr(retention, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    calls = _compactions(monkeypatch, job_manager, vdb)
+    old = time.time() - 10 * 24 * 3600
+    vdb.upsert_points([[1.0] * 384], [build_payload("old", ["k"], "old.txt", 0, {}, ingested_at=old)])
+
+    result = retention.apply_retention(days=1)
+    assert result["points_deleted"] == 1
+    assert result["jobs_evicted"] == 0
+    assert calls == ["vector_store"]
+
+
+def test_nothing_removed_nothing_compacted(stores, tmp_path, monkeypatch):
+    job_manager, vdb = stores
+    monkeypatch.setattr(retention, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    calls = _compactions(monkeypatch, job_manager, vdb)
+    result = retention.apply_retention(days=1)
+    assert "compaction" not in result
+    assert calls == []
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from src.models import SearchQuery
+from src.search import InvalidCursor, encode_cursor, run_search, stream_search
+from src.storage.embeddings import get_embedding_service
+from src.storage.vector_db import build_payload
+
+WORDS = "roses red tulip garden engine torque invoice audit budget sensor".split()
+
+
+def _ingest(vdb, texts):
+    vectors = get_embedding_service().embed_batch(texts)
+    vdb.upsert_points(vectors, [build_payload(t, ["docs"], "doc.txt", i, {}) for i, t in enumerate(texts)])
+
+
+@pytest.fixture
+def corpus(stores):
+    _, vdb = stores
+    # Distinct texts sharing a varying number of words with the query, so scores differ
+    texts = [" ".join(WORDS[(i + j) % len(WORDS)] for j in range(1 + i % 5)) + f" doc{i}" for i in range(30)]
+    _ingest(vdb, texts)
+    return vdb
+
+
+def _pages(query: SearchQuery):
+    while True:
+        response = run_search(query)
+        yield response
+        if response.next_cursor is None:
+            return
+        query = query.model_copy(update={"cursor": response.next_cursor})
+
+
+def _texts(results):
+    return [r.text for r in results]
+
+
+def test_pages_match_a_single_search(corpus):
+    query = SearchQuery(query="roses red tulip", top_k=7)
+    pages = list(_pages(query))
+    assert len(pages) == 5
+    paged = [r for page in pages for r in page.results]
+    single = run_search(SearchQuery(query="roses red tulip", top_k=30)).results
+    assert [round(r.score, 5) for r in paged] == [round(r.score, 5) for r in single]
+    assert sorted(_texts(paged)) == sorted(_texts(single))
+    assert len(set(_texts(paged))) == 30
+
+
+def test_inserts_between_pages_are_not_repeated(corpus):
+    query = SearchQuery(query="roses red tulip", top_k=5)
+    first = run_search(query)
+    # Outranks everything and shifts every hit down by one
+    _ingest(corpus, ["roses red tulip"])
+    second = run_search(query.model_copy(update={"cursor": first.next_cursor}))
+    assert not set(_texts(first.results)) & set(_texts(second.results))
+    assert second.results
+
+
+def test_cursor_is_tied_to_the_query(corpus):
+    first = run_search(SearchQuery(query="roses red tulip", top_k=5))
+    with pytest.raises(InvalidCursor):
+        run_search(SearchQuery(query="engine torque", top_k=5, cursor=first.next_cursor))
+    with pytest.raises(InvalidCursor):
+        run_search(SearchQuery(query="roses red tulip", top_k=5, filter_keys=["x"], cursor=first.next_cursor))
+    with pytest.raises(InvalidCursor):
+        run_search(SearchQuery(query="roses red tulip", top_k=5, cursor="not-a-cursor"))
+
+
+def test_last_page_has_no_cursor(corpus):
+    response = run_search(SearchQuery(query="roses", top_k=30))
+    assert len(response.results) == 30
+    assert response.next_cursor is None
+    query = SearchQuery(query="roses", top_k=5)
+    cursor = encode_cursor(query, 30, 0.0, "missing")
+    response = run_search(query.model_copy(update={"cursor": cursor}))
+    assert response.results == [] and response.next_cursor is None
+
+
+def test_stream_pages_through_everything(corpus, monkeypatch):
+    from src import search
+    monkeypatch.setattr(search, "STREAM_PAGE_SIZE", 4)
+
+    async def collect(query, limit):
+        return [json.loads(line) for chunk in [c async for c in stream_search(query, limit)]
+                for line in chunk.splitlines()]
+
+    lines = asyncio.run(collect(SearchQuery(query="roses red tulip"), 100))
+    assert lines[-1] == {"done": True, "count": 30, "next_cursor": None}
+    assert len({line["text"] for line in lines[:-1]}) == 30
+
+    lines = asyncio.run(collect(SearchQuery(query="roses red tulip"), 10))
+    assert lines[-1]["count"] == 10 and lines[-1]["next_cursor"]
+    query = SearchQuery(query="roses red tulip", cursor=lines[-1]["next_cursor"])
+    rest = asyncio.run(collect(query, 100))
+    assert rest[-1]["count"] == 20
+    assert not {line["text"] for line in lines[:-1]} & {line["text"] for line in rest[:-1]}
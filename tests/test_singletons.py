@@ -0,0 +1,38 @@
+import threading
+import time
+import pytest
+from src.processing import jobs
+from src.storage import embeddings
+
+
+class SlowService:
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        # Long enough for every thread to find the singleton still unset
+        time.sleep(0.1)
+        type(self).created += 1
+
+
+def _call_concurrently(getter, threads=8):
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(getter())) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+@pytest.mark.parametrize("module, cls_name, attr, getter", [
+    (embeddings, "EmbeddingService", "_embedding_service", "get_embedding_service"),
+    (jobs, "JobManager", "_job_manager", "get_job_manager"),
+])
+def test_singleton_is_created_once(monkeypatch, module, cls_name, attr, getter):
+    service = type("Slow", (SlowService,), {"created": 0})
+    monkeypatch.setattr(module, cls_name, service)
+    monkeypatch.setattr(embeddings, "EMBED_SOCKET", None)
+    monkeypatch.setattr(module, attr, None)
+    results = _call_concurrently(getattr(module, getter))
+    assert service.created == 1
+    assert len({id(r) for r in results}) == 1